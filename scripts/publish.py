@@ -6,28 +6,29 @@ This script can be used to manually build and publish the package to PyPI.
 For automated publishing, use the GitHub Actions workflow.
 """
 
+import importlib.util
 import os
+import shlex
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+BUILD_REQUIREMENTS = ("build", "setuptools", "wheel")
+
 
 # add * below to force check to be a keyword argument only
 def run_command(cmd, cwd=None, *, check=True):
-    """Run a shell command and return the result."""
-    print(f"Running: {' '.join(cmd)}")
-    try:
-        result = subprocess.run(
-            cmd, cwd=cwd, check=check, capture_output=True, text=True
-        )
-        if result.stdout:
-            print(result.stdout)
-        return result
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {e}")
-        if e.stderr:
-            print(f"Error output: {e.stderr}")
-        sys.exit(1)
+    """Run a shell command and return the result.
+
+    Output is not captured: the command inherits our stdout/stderr so that
+    progress from long-running tools (pytest, twine, pip) is shown live.
+    The command is echoed (shell-quoted) only when stdout is a terminal.
+    Raises subprocess.CalledProcessError on failure when check is True.
+    """
+    if sys.stdout.isatty():
+        print(f"Running: {shlex.join(cmd)}")
+    return subprocess.run(cmd, cwd=cwd, check=check)
 
 
 def setup_environment():
@@ -46,23 +47,39 @@ def clean_build_artifacts():
 
 
 def run_tests():
-    """Run the test suite."""
+    """Run the test suite, aborting the release if it fails."""
     print("\n🔍 Step 2: Run tests")
+    cmd = ["python", "-m", "pytest"]
+    if importlib.util.find_spec("xdist") is not None:
+        # leave one core free on CI runners, use all cores locally
+        workers = (
+            str(max((os.cpu_count() or 2) - 1, 1)) if os.environ.get("CI") else "auto"
+        )
+        # keep each xdist_group (tests sharing session fixtures) on one worker
+        cmd += ["-n", workers, "--dist=loadgroup"]
+    cmd.append("tests/")
     try:
-        run_command(["python", "-m", "pytest", "tests/"])
-    except Exception:
-        print("⚠️  Tests failed or pytest not available. Continuing...")
+        run_command(cmd)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Tests failed or pytest not available: {e}")
+        sys.exit(1)
 
 
 def build_package():
     """Build the package."""
     print("\n🔧 Step 3: Build package")
+    cmd = ["python", "-m", "build", "--sdist", "--wheel"]
+    # Build in the current env when it already has the build backend, which
+    # avoids bootstrapping an isolated venv for the sdist and wheel steps.
+    if all(importlib.util.find_spec(name) for name in BUILD_REQUIREMENTS):
+        cmd.append("--no-isolation")
+    else:
+        print("📦 Build dependencies not installed, using an isolated build env...")
     try:
-        # Try modern build first
-        run_command(["python", "-m", "build"])
-    except Exception:
-        print("📦 Falling back to setuptools...")
-        run_command(["python", "setup.py", "sdist", "bdist_wheel"])
+        run_command(cmd)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Build failed: {e}")
+        sys.exit(1)
 
 
 def check_package():
@@ -70,17 +87,40 @@ def check_package():
     print("\n✅ Step 4: Check built packages")
     try:
         run_command(["python", "-m", "twine", "check", "dist/*"])
-    except Exception:
+    except subprocess.CalledProcessError:
         print("⚠️  Twine check not available. Skipping...")
 
 
+def upload_dist(repository=None):
+    """Upload the files in dist/, concurrently when twine cannot prompt.
+
+    With credentials in TWINE_USERNAME/TWINE_PASSWORD, each file gets its own
+    non-interactive twine process; --skip-existing lets a rerun finish a
+    partly uploaded release. Otherwise one twine process uploads every file,
+    so it prompts for credentials once.
+    """
+    dist_files = sorted(str(path) for path in Path("dist").iterdir())
+    if not dist_files:
+        msg = "No distribution files found in dist/"
+        raise FileNotFoundError(msg)
+    cmd = ["python", "-m", "twine", "upload"]
+    if repository:
+        cmd += ["--repository", repository]
+    if not (os.environ.get("TWINE_USERNAME") and os.environ.get("TWINE_PASSWORD")):
+        run_command([*cmd, *dist_files])
+        return
+    cmd += ["--non-interactive", "--skip-existing"]
+    with ThreadPoolExecutor(max_workers=len(dist_files)) as executor:
+        futures = [executor.submit(run_command, [*cmd, f]) for f in dist_files]
+        for future in futures:
+            future.result()
+
+
 def upload_to_test_pypi():
     """Upload package to Test PyPI and optionally test installation."""
     print("\n🧪 Uploading to Test PyPI...")
     try:
-        run_command(
-            ["python", "-m", "twine", "upload", "--repository", "testpypi", "dist/*"]
-        )
+        upload_dist(repository="testpypi")
         print("✅ Successfully uploaded to Test PyPI!")
         print("🔗 Check your package at:")
         print("https://test.pypi.org/project/smartapi-mcp/")
@@ -102,8 +142,8 @@ def upload_to_test_pypi():
                 ]
             )
         return True
-    except Exception:
-        print("❌ Failed to upload to Test PyPI")
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"❌ Failed to upload to Test PyPI: {e}")
         return False
 
 
@@ -111,12 +151,12 @@ def upload_to_pypi():
     """Upload package to PyPI."""
     print("\n🚀 Uploading to PyPI...")
     try:
-        run_command(["python", "-m", "twine", "upload", "dist/*"])
+        upload_dist()
         print("🎉 Successfully uploaded to PyPI!")
         print("🔗 Check your package at: https://pypi.org/project/smartapi-mcp/")
         return True
-    except Exception:
-        print("❌ Failed to upload to PyPI")
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"❌ Failed to upload to PyPI: {e}")
         return False
 
 
@@ -4,31 +4,60 @@ SmartAPI MCP Server Package
 Create MCP servers for one or multiple APIs registered in SmartAPI registry.
 """
 
+from importlib import import_module
+
 __version__ = "0.2.0"
 __author__ = "BioThings Team"
 __email__ = "help@biothings.io"
 
-# Optional imports for when dependencies are available
-try:
-    from .server import get_mcp_server, get_merged_mcp_server, merge_mcp_servers
-    from .smartapi import (
-        PREDEFINED_API_SETS,
-        get_base_server_url,
-        get_predefined_api_set,
-        get_smartapi_ids,
-        load_api_spec,
-    )
-
-    __all__ = [
-        "PREDEFINED_API_SETS",
-        "get_base_server_url",
-        "get_mcp_server",
-        "get_merged_mcp_server",
-        "get_predefined_api_set",
-        "get_smartapi_ids",
-        "load_api_spec",
-        "merge_mcp_servers",
-    ]
-except ImportError:
-    # Dependencies not available, only export version info
-    __all__ = []
+# Public names are imported lazily (PEP 562) so that `import smartapi_mcp`
+# does not pull in awslabs.openapi_mcp_server and friends until needed.
+_LAZY_EXPORTS = {
+    "get_mcp_server": ".server",
+    "get_merged_mcp_server": ".server",
+    "get_smart_mcp_server_with_routing": ".server",
+    "load_mcp_servers": ".server",
+    "merge_mcp_servers": ".server",
+    "AsyncSmartAPIClient": ".smartapi",
+    "PREDEFINED_API_SETS": ".smartapi",
+    "aload_api_spec": ".smartapi",
+    "get_base_server_url": ".smartapi",
+    "get_predefined_api_set": ".smartapi",
+    "get_smartapi_ids": ".smartapi",
+    "load_api_spec": ".smartapi",
+}
+
+__all__ = [
+    "PREDEFINED_API_SETS",
+    "AsyncSmartAPIClient",
+    "aload_api_spec",
+    "get_base_server_url",
+    "get_mcp_server",
+    "get_merged_mcp_server",
+    "get_predefined_api_set",
+    "get_smart_mcp_server_with_routing",
+    "get_smartapi_ids",
+    "load_api_spec",
+    "load_mcp_servers",
+    "merge_mcp_servers",
+]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        err_msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(err_msg)
+    try:
+        module = import_module(module_name, __name__)
+    except ImportError as exc:
+        # Dependencies not available, only version info is usable
+        err_msg = f"{name!r} requires optional dependencies: {exc}"
+        raise AttributeError(err_msg) from exc
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_EXPORTS])
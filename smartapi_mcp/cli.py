@@ -5,23 +5,34 @@ Provides CLI commands for running and managing the SmartAPI MCP server.
 """
 
 import argparse
-import asyncio
 import signal
 import sys
-import traceback
+from typing import NamedTuple
 
-from awslabs.openapi_mcp_server import get_format, logger
-from awslabs.openapi_mcp_server.server import get_all_counts
-from awslabs.openapi_mcp_server.utils.metrics_provider import metrics
+from . import __version__
 
-from .config import load_config
-from .server import get_merged_mcp_server, get_smart_mcp_server_with_routing
+# transports served over the network on host:port; anything else uses stdio
+NETWORK_TRANSPORTS = frozenset({"http", "sse"})
 
 
-def main():
+class ServerCounts(NamedTuple):
+    """Component counts of an MCP server, as returned by get_all_counts."""
+
+    prompts: int
+    tools: int
+    resources: int
+    resource_templates: int
+
+
+def _create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Create MCP tools based on multiple registered SmartAPI APIs."
     )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=f"%(prog)s {__version__}",
+    )
     parser.add_argument(
         "--api_set",
         help=(
@@ -83,7 +94,30 @@ def main():
         help="Set logging level",
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+# built once at import and reused by every main() call
+_PARSER = _create_parser()
+
+
+def main():
+    args = _PARSER.parse_args()
+
+    # Heavy imports are deferred until after argument parsing, so --help and
+    # --version return without loading awslabs.openapi_mcp_server/FastMCP.
+    import asyncio  # noqa: PLC0415
+    import traceback  # noqa: PLC0415
+
+    from awslabs.openapi_mcp_server import get_format, logger  # noqa: PLC0415
+    from awslabs.openapi_mcp_server.server import get_all_counts  # noqa: PLC0415
+
+    from .config import load_config  # noqa: PLC0415
+    from .server import (  # noqa: PLC0415
+        get_merged_mcp_server,
+        get_smart_mcp_server_with_routing,
+    )
+    from .smartapi import close_client  # noqa: PLC0415
 
     # Set up logging with loguru at specified level
     logger.remove()
@@ -100,10 +134,18 @@ def main():
 
     logger.debug("Configuration loaded.")
 
-    # Use smart routing if enabled
-    if getattr(config, "smart_routing", False):
-        merged_server = asyncio.run(
-            get_smart_mcp_server_with_routing(
+    async def _startup():
+        # Close the shared registry client before this event loop ends
+        try:
+            return await _create_server()
+        finally:
+            await close_client()
+
+    async def _create_server():
+        # Create the server and count its components in a single event loop
+        # Use smart routing if enabled
+        if getattr(config, "smart_routing", False):
+            server = await get_smart_mcp_server_with_routing(
                 smartapi_q=config.smartapi_q,
                 smartapi_id=config.smartapi_id,
                 smartapi_ids=config.smartapi_ids,
@@ -113,10 +155,8 @@ def main():
                 smart_routing=getattr(config, "smart_routing", False),
                 max_context_tools=getattr(config, "max_context_tools", 50),
             )
-        )
-    else:
-        merged_server = asyncio.run(
-            get_merged_mcp_server(
+        else:
+            server = await get_merged_mcp_server(
                 smartapi_q=config.smartapi_q,
                 smartapi_id=config.smartapi_id,
                 smartapi_ids=config.smartapi_ids,
@@ -124,38 +164,41 @@ def main():
                 api_set=config.smartapi_api_set,
                 server_name=config.server_name,
             )
-        )
 
-    # Set up signal handlers (local implementation avoids sys.exit in handler)
-    setup_signal_handlers()
+        try:
+            counts = ServerCounts(*await get_all_counts(server))
 
-    try:
-        prompt_count, tool_count, resource_count, resource_template_count = asyncio.run(
-            get_all_counts(merged_server)
-        )
-
-        # Log all counts in a single statement
-        logger.info(
-            f"Server components: {prompt_count} prompts, {tool_count} tools, "
-            f"{resource_count} resources, {resource_template_count} resource templates"
-        )
+            # Log all counts in a single statement
+            logger.info(
+                f"Server components: {counts.prompts} prompts, {counts.tools} tools, "
+                f"{counts.resources} resources, "
+                f"{counts.resource_templates} resource templates"
+            )
 
-        # Check if we have at least one tool or resource
-        if tool_count == 0 and resource_count == 0:
-            logger.warning(
-                (
-                    "No tools or resources were registered. This might "
-                    "indicate an issue "
-                    "with the API specification or authentication."
-                ),
+            # Check if we have at least one tool or resource
+            if counts.tools == 0 and counts.resources == 0:
+                logger.warning(
+                    (
+                        "No tools or resources were registered. This might "
+                        "indicate an issue "
+                        "with the API specification or authentication."
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"Error counting tools and resources: {e}")
+            logger.error(
+                "Server shutting down due to error in tool/resource registration."
             )
-    except Exception as e:
-        logger.error(f"Error counting tools and resources: {e}")
-        logger.error("Server shutting down due to error in tool/resource registration.")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        sys.exit(1)
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            sys.exit(1)
+        return server
+
+    merged_server = asyncio.run(_startup())
 
-    if config.transport in ["http", "sse"]:
+    # Set up signal handlers (local implementation avoids sys.exit in handler)
+    setup_signal_handlers()
+
+    if config.transport in NETWORK_TRANSPORTS:
         # Run server with http transport only
         logger.info(f"Running server with {config.transport} transport")
         merged_server.run(
@@ -173,6 +216,11 @@ def setup_signal_handlers() -> None:
     Modified from awslabs.openapi_mcp_server.server.setup_signal_handlers
     Original version calls sys.exit in the handler which can cause issues.
     """
+    from awslabs.openapi_mcp_server import logger  # noqa: PLC0415
+    from awslabs.openapi_mcp_server.utils.metrics_provider import (  # noqa: PLC0415
+        metrics,
+    )
+
     handled = {"done": False}
 
     def _handler(sig, frame):  # noqa: ARG001
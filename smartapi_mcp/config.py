@@ -1,4 +1,6 @@
+import copy
 import os
+from collections import OrderedDict
 from dataclasses import fields
 from typing import Any
 
@@ -19,6 +21,45 @@ class Config(_config.Config):
     max_context_tools: int = 50
 
 
+# SmartAPI-specific environment variables, in the order load_config applies them
+_ENV_KEYS = (
+    "SMARTAPI_ID",
+    "SMARTAPI_IDS",
+    "SMARTAPI_EXCLUDE_IDS",
+    "SMARTAPI_Q",
+    "SMARTAPI_API_SET",
+    "SMARTAPI_ROUTING",
+    "MAX_CONTEXT_TOOLS",
+    "SERVER_NAME",
+)
+
+# snapshot of the SmartAPI-specific environment, taken on first use
+_env_cache: dict[str, str] | None = None
+
+
+def _get_env_cache() -> dict[str, str]:
+    global _env_cache  # noqa: PLW0603
+    if _env_cache is None:
+        # look up the known keys rather than scanning all of os.environ
+        _env_cache = {
+            key: value
+            for key in _ENV_KEYS
+            if (value := os.environ.get(key)) is not None
+        }
+    return _env_cache
+
+
+def reload_env() -> None:
+    """Drop the environment snapshot so the next load_config() rereads it.
+
+    Memoized load_config() results are dropped too, since the base awslabs
+    config (SERVER_PORT, API_BASE_URL, AUTH_*, ...) is not part of their key.
+    """
+    global _env_cache  # noqa: PLW0603
+    _env_cache = None
+    clear_cache()
+
+
 def _parse_bool(value: str) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
@@ -30,7 +71,67 @@ def _parse_int(value: str, default: int) -> int:
         return default
 
 
+# load_config() results keyed on the frozen args and the SmartAPI environment
+# snapshot, least recently used first beyond CONFIG_CACHE_SIZE
+CONFIG_CACHE_SIZE = 16
+_config_cache: OrderedDict[tuple, Config] = OrderedDict()
+
+
+def clear_cache() -> None:
+    """Forget memoized load_config() results."""
+    _config_cache.clear()
+
+
+def _freeze_args(args: Any) -> tuple | None:
+    """Return a hashable form of args, or None if it cannot be used as a key."""
+    if args is None:
+        return ()
+    try:
+        items = vars(args).items()
+    except TypeError:
+        return None
+    frozen = tuple(
+        sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in items)
+    )
+    try:
+        hash(frozen)
+    except TypeError:
+        return None
+    return frozen
+
+
 def load_config(args: Any = None) -> Config:
+    """Load the configuration, reusing the result for repeated identical calls.
+
+    Results are keyed on the argument values and the SmartAPI environment
+    snapshot; call reload_env() after changing the environment. Each call
+    returns its own copy, so callers may modify the result.
+    """
+    frozen_args = _freeze_args(args)
+    if frozen_args is None:
+        return _load_config(args)
+    key = (args is None, frozen_args, tuple(_get_env_cache().items()))
+    config = _config_cache.get(key)
+    if config is None:
+        config = _config_cache[key] = _load_config(args)
+        if len(_config_cache) > CONFIG_CACHE_SIZE:
+            _config_cache.popitem(last=False)
+    else:
+        _config_cache.move_to_end(key)
+    return _copy_config(config)
+
+
+def _copy_config(config: Config) -> Config:
+    """Copy config without sharing its list fields."""
+    config = copy.copy(config)
+    if config.smartapi_ids is not None:
+        config.smartapi_ids = list(config.smartapi_ids)
+    if config.smartapi_exclude_ids is not None:
+        config.smartapi_exclude_ids = list(config.smartapi_exclude_ids)
+    return config
+
+
+def _load_config(args: Any = None) -> Config:
     config = Config()
     _cfg = _config.load_config(args)
     for field in fields(_cfg):
@@ -55,17 +156,14 @@ def load_config(args: Any = None) -> Config:
     }
 
     # Load environment variables
-    env_loaded = {}
-    for key, setter in env_vars.items():
-        if key in os.environ:
-            env_value = os.environ[key]
-            setter(env_value)
-            env_loaded[key] = env_value
-
-    if env_loaded:
+    env = _get_env_cache()
+    for key, env_value in env.items():
+        env_vars[key](env_value)
+
+    if env:
         logger.debug(
-            f"Loaded {len(env_loaded)} SmartAPI-specific environment variables: "
-            f"{', '.join(env_loaded.keys())}"
+            f"Loaded {len(env)} SmartAPI-specific environment variables: "
+            f"{', '.join(env)}"
         )
 
     # Load from arguments
@@ -1,7 +1,12 @@
 """Smart Router and Progressive Loader Functions."""
 
-import json
-from collections import defaultdict
+import asyncio
+import contextlib
+import importlib.util
+import math
+import os
+import re
+from collections import OrderedDict, defaultdict, deque
 from pathlib import Path
 from typing import Any
 
@@ -9,17 +14,19 @@ from awslabs.openapi_mcp_server import logger
 from fastmcp import FastMCP
 from fastmcp.tools import Tool
 
-from .smartapi import load_api_spec
+from .smartapi import aload_api_spec, aload_api_specs, json_dumps, json_loads
 
 try:  # Optional semantic search dependencies
     import faiss  # type: ignore
     import numpy as np
+    import torch
     from sentence_transformers import SentenceTransformer
 
     SEMANTIC_SEARCH_AVAILABLE = True
 except Exception:  # pragma: no cover - optional dependency path
     faiss = None  # type: ignore[assignment]
     np = None  # type: ignore[assignment]
+    torch = None  # type: ignore[assignment]
     SentenceTransformer = None  # type: ignore[assignment]
     SEMANTIC_SEARCH_AVAILABLE = False
 
@@ -29,14 +36,75 @@ SEMANTIC_INDEX_FILE = SEMANTIC_CACHE_DIR / "semantic_index.faiss"
 API_DESCRIPTIONS_CACHE = SEMANTIC_CACHE_DIR / "api_descriptions.json"
 API_IDS_CACHE = SEMANTIC_CACHE_DIR / "api_ids.json"
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# int8 dynamically-quantized ONNX export shipped in the model's hub repo
+EMBEDDING_ONNX_FILE = "onnx/model_qint8_avx2.onnx"
+EMBEDDING_MODELS_DIR = SEMANTIC_CACHE_DIR / "models"
+ENCODE_BATCH_SIZE = 64
+# below this many vectors an exhaustive IndexFlatIP is both exact and fast;
+# IVF also needs ~39 training points per list to train well
+IVF_MIN_VECTORS = 2048
+# above this many vectors, IVF lists are product-quantized to save memory
+IVF_PQ_MIN_VECTORS = 10000
+# concurrent search queries are coalesced into one encode + index.search call,
+# flushed after QUERY_BATCH_WAIT seconds or once QUERY_BATCH_SIZE are pending
+QUERY_BATCH_SIZE = 32
+QUERY_BATCH_WAIT = 0.005
+# servers created at once by load_tools_batch
+LOAD_TOOLS_CONCURRENCY = 16
+
+CATEGORY_KEYWORDS: dict[str, list[str]] = {
+    "bioinformatics": [
+        "gene",
+        "protein",
+        "genomic",
+        "genome",
+        "sequence",
+        "variant",
+        "mutation",
+        "pathway",
+        "bio",
+    ],
+    "clinical": ["clinical", "patient", "phenotype", "disease", "trial"],
+    "literature": ["literature", "publication", "paper", "abstract"],
+}
+# one pattern per category: a single regex scan replaces the per-keyword
+# substring checks (keywords match anywhere, e.g. "gene" in "genes").
+# Patterns are matched against lowercased text.
+CATEGORY_PATTERNS: dict[str, re.Pattern[str]] = {
+    category: re.compile("|".join(map(re.escape, keywords)))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
 
 _semantic_cache: dict[str, Any] = {
     "index": None,
     "ids": None,
+    # (ids list, same ids as a numpy object array) for slicing search hits
+    "ids_array": None,
     "descriptions": None,
+    # (descriptions dict, same dict with lowercased values) for category routing
+    "descriptions_lower": None,
     "model": None,
 }
 
+# locks serializing one-off setup (e.g. model creation, so concurrent first
+# queries load it only once), by name. An asyncio.Lock binds to the loop it is
+# first contended in, so each lock is recreated for a new event loop.
+_locks: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+
+# in-process API descriptions, keyed by the sorted tuple of requested IDs,
+# least recently used first beyond DESCRIPTIONS_CACHE_SIZE
+DESCRIPTIONS_CACHE_SIZE = 8
+_descriptions_cache: OrderedDict[tuple[str, ...], dict[str, str]] = OrderedDict()
+
+
+def _get_lock(name: str) -> asyncio.Lock:
+    """Return the named lock for the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _locks.get(name)
+    if entry is None or entry[0] is not loop:
+        entry = _locks[name] = (loop, asyncio.Lock())
+    return entry[1]
+
 
 def _ensure_cache_dir() -> None:
     SEMANTIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -46,9 +114,9 @@ def _load_cached_descriptions() -> tuple[list[str], dict[str, str]] | None:
     if not API_DESCRIPTIONS_CACHE.exists() or not API_IDS_CACHE.exists():
         return None
     try:
-        ids = json.loads(API_IDS_CACHE.read_text(encoding="utf-8"))
-        descriptions = json.loads(API_DESCRIPTIONS_CACHE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
+        ids = json_loads(API_IDS_CACHE.read_bytes())
+        descriptions = json_loads(API_DESCRIPTIONS_CACHE.read_bytes())
+    except ValueError:
         return None
     if not isinstance(ids, list) or not isinstance(descriptions, dict):
         return None
@@ -57,8 +125,8 @@ def _load_cached_descriptions() -> tuple[list[str], dict[str, str]] | None:
 
 def _save_cached_descriptions(api_ids: list[str], descriptions: dict[str, str]) -> None:
     _ensure_cache_dir()
-    API_IDS_CACHE.write_text(json.dumps(api_ids), encoding="utf-8")
-    API_DESCRIPTIONS_CACHE.write_text(json.dumps(descriptions), encoding="utf-8")
+    API_IDS_CACHE.write_bytes(json_dumps(api_ids))
+    API_DESCRIPTIONS_CACHE.write_bytes(json_dumps(descriptions))
 
 
 def _load_cached_index() -> Any | None:
@@ -66,6 +134,14 @@ def _load_cached_index() -> Any | None:
         return None
     if faiss is None:
         return None
+    # Memory-map the index so pages are loaded on demand instead of copied
+    # onto the heap; fall back to a full read for index types without mmap.
+    try:
+        return faiss.read_index(
+            str(SEMANTIC_INDEX_FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+    except Exception as exc:  # pragma: no cover - faiss mmap unsupported
+        logger.debug(f"Cannot memory-map semantic index, reading it fully: {exc}")
     try:
         return faiss.read_index(str(SEMANTIC_INDEX_FILE))
     except Exception:  # pragma: no cover - faiss read errors
@@ -81,22 +157,107 @@ def _save_cached_index(index: Any) -> None:
     faiss.write_index(index, str(SEMANTIC_INDEX_FILE))
 
 
-def _load_model() -> Any:
+async def _load_model() -> Any:
     if SentenceTransformer is None:
         err_msg = "Semantic search dependencies unavailable."
         raise RuntimeError(err_msg)
     if _semantic_cache["model"] is None:
-        _semantic_cache["model"] = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        async with _get_lock("model"):
+            if _semantic_cache["model"] is None:
+                # model init takes seconds; keep the event loop responsive
+                _semantic_cache["model"] = await asyncio.to_thread(_create_model)
     return _semantic_cache["model"]
 
 
-def _build_api_descriptions(smartapi_ids: list[str]) -> dict[str, str]:
+def _create_model() -> Any:
+    """Prefer the quantized ONNX Runtime model, falling back to PyTorch."""
+    if importlib.util.find_spec("onnxruntime") is not None:
+        try:
+            return SentenceTransformer(
+                EMBEDDING_MODEL_NAME,
+                backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_FILE},
+                cache_folder=str(EMBEDDING_MODELS_DIR),
+            )
+        except Exception as exc:  # pragma: no cover - optional dependency path
+            logger.warning(f"Failed to load ONNX embedding model, using PyTorch: {exc}")
+    _configure_torch_threads()
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    model.eval()
+    return model
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _configure_torch_threads() -> None:
+    """Use every CPU available to this process for intra-op parallelism."""
+    if torch is None:
+        return
+    torch.set_num_threads(_available_cpus())
+    # only settable before any inter-op parallel work has started
+    with contextlib.suppress(RuntimeError):
+        torch.set_num_interop_threads(2)
+
+
+def _encode(model: Any, texts: list[str]) -> Any:
+    """Encode texts into L2-normalized, C-contiguous float32 embeddings.
+
+    SentenceTransformer.encode sorts inputs by length before batching and
+    restores the original order afterwards, so each batch is padded only to
+    its own longest text.
+    """
+    no_grad = torch.inference_mode() if torch is not None else contextlib.nullcontext()
+    with no_grad:
+        embeddings = model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+    # FAISS needs C-contiguous float32 rows to use its SIMD kernels
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def _build_index(embeddings_np: Any) -> Any:
+    """Build an inner-product FAISS index sized for the number of vectors."""
+    n_vectors, dim = embeddings_np.shape
+    if n_vectors < IVF_MIN_VECTORS:
+        index = faiss.IndexFlatIP(dim)
+    else:
+        nlist = int(math.sqrt(n_vectors))
+        if n_vectors >= IVF_PQ_MIN_VECTORS:
+            index = faiss.index_factory(
+                dim, f"IVF{nlist},PQ32x8", faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(
+                quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT
+            )
+        index.train(embeddings_np)  # type: ignore[call-arg]
+    index.add(embeddings_np)  # type: ignore[call-arg]
+    _set_nprobe(index)
+    return index
+
+
+def _set_nprobe(index: Any) -> None:
+    """Set how many IVF lists are probed per search; no-op for flat indexes."""
+    if hasattr(index, "nlist"):
+        index.nprobe = max(8, index.nlist // 16)
+
+
+async def _build_api_descriptions(smartapi_ids: list[str]) -> dict[str, str]:
     descriptions: dict[str, str] = {}
+    specs = await aload_api_specs(smartapi_ids)
     for api_id in smartapi_ids:
-        try:
-            spec = load_api_spec(api_id)
-        except Exception as exc:  # pragma: no cover - network/spec errors
-            logger.warning(f"Failed to load API spec for {api_id}: {exc}")
+        spec = specs[api_id]
+        if isinstance(spec, BaseException):  # pragma: no cover - network errors
+            logger.warning(f"Failed to load API spec for {api_id}: {spec}")
             continue
         info = spec.get("info", {}) if isinstance(spec, dict) else {}
         title = info.get("title", "")
@@ -107,21 +268,83 @@ def _build_api_descriptions(smartapi_ids: list[str]) -> dict[str, str]:
     return descriptions
 
 
-def _ensure_semantic_index(
+async def _get_descriptions(smartapi_ids: list[str]) -> dict[str, str]:
+    """Return API descriptions, only fetching specs on a cache miss.
+
+    Lookup order: the in-process cache, the loaded semantic index, the
+    on-disk description cache, and finally the network.
+    """
+    key = tuple(sorted(smartapi_ids))
+    if key in _descriptions_cache:
+        _descriptions_cache.move_to_end(key)
+        return _descriptions_cache[key]
+
+    requested = set(smartapi_ids)
+    if (
+        _semantic_cache["descriptions"]
+        and set(_semantic_cache["ids"] or ()) == requested
+    ):
+        descriptions = _semantic_cache["descriptions"]
+    else:
+        cached = _load_cached_descriptions()
+        if cached and set(cached[0]) == requested:
+            descriptions = cached[1]
+        else:
+            descriptions = await _build_api_descriptions(smartapi_ids)
+
+    _descriptions_cache[key] = descriptions
+    if len(_descriptions_cache) > DESCRIPTIONS_CACHE_SIZE:
+        _descriptions_cache.popitem(last=False)
+    return descriptions
+
+
+def _loaded_semantic_index(
+    smartapi_ids: list[str],
+) -> tuple[Any, list[str], dict[str, str]] | None:
+    """Return the in-memory index if it was built for the same IDs, in any order."""
+    index = _semantic_cache["index"]
+    if index is None or set(_semantic_cache["ids"] or ()) != set(smartapi_ids):
+        return None
+    return index, _semantic_cache["ids"], _semantic_cache["descriptions"]
+
+
+async def _ensure_semantic_index(
     smartapi_ids: list[str],
 ) -> tuple[Any, list[str], dict[str, str]]:
     if not SEMANTIC_SEARCH_AVAILABLE or faiss is None or np is None:
         err_msg = "Semantic search dependencies unavailable."
         raise RuntimeError(err_msg)
 
+    loaded = _loaded_semantic_index(smartapi_ids)
+    if loaded is not None:
+        return loaded
+    # concurrent first queries wait for one load instead of each building an
+    # index; queries can only be batched together if they share the index
+    async with _get_lock("index"):
+        loaded = _loaded_semantic_index(smartapi_ids)
+        if loaded is not None:
+            return loaded
+        return await _load_semantic_index(smartapi_ids)
+
+
+async def _load_semantic_index(
+    smartapi_ids: list[str],
+) -> tuple[Any, list[str], dict[str, str]]:
+    """Load the index from the disk cache, or build it if that is stale."""
     cached = _load_cached_descriptions()
     if cached:
         cached_ids, cached_descriptions = cached
-        if cached_ids == smartapi_ids:
+        # compare as sets so the cache survives a reordered ID list
+        if set(cached_ids) == set(smartapi_ids):
             cached_index = _load_cached_index()
             if cached_index is not None:
+                _set_nprobe(cached_index)
                 _semantic_cache["index"] = cached_index
                 _semantic_cache["ids"] = cached_ids
+                _semantic_cache["ids_array"] = (
+                    cached_ids,
+                    np.asarray(cached_ids, dtype=object),
+                )
                 _semantic_cache["descriptions"] = cached_descriptions
                 return (
                     _semantic_cache["index"],
@@ -129,22 +352,23 @@ def _ensure_semantic_index(
                     _semantic_cache["descriptions"],
                 )
 
-    descriptions = _build_api_descriptions(smartapi_ids)
+    descriptions = await _get_descriptions(smartapi_ids)
     ids = list(descriptions.keys())
     if not ids:
         err_msg = "No API descriptions available for semantic search."
         raise ValueError(err_msg)
 
-    model = _load_model()
-    embeddings = model.encode([descriptions[api_id] for api_id in ids])
-    embeddings_np = np.array(embeddings, dtype="float32")
+    model = await _load_model()
+    # encoding and index training are CPU-bound; run them off the event loop
+    embeddings_np = await asyncio.to_thread(
+        _encode, model, [descriptions[api_id] for api_id in ids]
+    )
 
-    index = faiss.IndexFlatIP(embeddings_np.shape[1])
-    faiss.normalize_L2(embeddings_np)
-    index.add(embeddings_np)  # type: ignore[call-arg]
+    index = await asyncio.to_thread(_build_index, embeddings_np)
 
     _semantic_cache["index"] = index
     _semantic_cache["ids"] = ids
+    _semantic_cache["ids_array"] = (ids, np.asarray(ids, dtype=object))
     _semantic_cache["descriptions"] = descriptions
     _save_cached_descriptions(ids, descriptions)
     _save_cached_index(index)
@@ -155,66 +379,143 @@ def _ensure_semantic_index(
     )
 
 
-def _category_routing(query: str, smartapi_ids: list[str]) -> dict[str, list[str]]:
-    categories = {
-        "bioinformatics": [
-            "gene",
-            "protein",
-            "genomic",
-            "genome",
-            "sequence",
-            "variant",
-            "mutation",
-            "pathway",
-            "bio",
-        ],
-        "clinical": ["clinical", "patient", "phenotype", "disease", "trial"],
-        "literature": ["literature", "publication", "paper", "abstract"],
-    }
+async def _category_routing(
+    query: str, smartapi_ids: list[str]
+) -> dict[str, list[str]]:
     query_lower = query.lower()
     matched_categories = [
         category
-        for category, keywords in categories.items()
-        if any(keyword in query_lower for keyword in keywords)
+        for category, pattern in CATEGORY_PATTERNS.items()
+        if pattern.search(query_lower)
     ]
     if not matched_categories:
         return {}
 
-    descriptions = _build_api_descriptions(smartapi_ids)
+    descriptions = await _get_descriptions(smartapi_ids)
+    cached_lower = _semantic_cache["descriptions_lower"]
+    if cached_lower is not None and cached_lower[0] is descriptions:
+        descriptions_lower = cached_lower[1]
+    else:
+        descriptions_lower = {k: v.lower() for k, v in descriptions.items()}
+        _semantic_cache["descriptions_lower"] = (descriptions, descriptions_lower)
+
     results: dict[str, list[str]] = defaultdict(list)
-    for api_id, text in descriptions.items():
-        text_lower = text.lower()
+    for api_id, text in descriptions_lower.items():
         for category in matched_categories:
-            if any(keyword in text_lower for keyword in categories[category]):
+            if CATEGORY_PATTERNS[category].search(text):
                 results[category].append(api_id)
     return dict(results)
 
 
+class QueryBatcher:
+    """Coalesce concurrent semantic search queries into batched searches.
+
+    Queries submitted within max_wait seconds of each other are encoded in
+    one model.encode call and searched with one index.search call, which
+    costs about the same as a single query. Each caller gets back its own
+    (distances, indices) row, truncated to the limit it asked for.
+    """
+
+    def __init__(
+        self, max_batch_size: int = QUERY_BATCH_SIZE, max_wait: float = QUERY_BATCH_WAIT
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: deque[tuple[Any, Any, str, int, asyncio.Future]] = deque()
+        self._timer: asyncio.TimerHandle | None = None
+        # keep references to in-flight batches so they are not garbage collected
+        self._tasks: set[asyncio.Task] = set()
+        # the loop the pending queries and timer belong to
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def submit(self, index: Any, model: Any, query: str, limit: int) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # a timer or queries left behind by a previous (e.g. closed) loop
+            # would never be flushed, leaving new queries waiting forever
+            self._reset(loop)
+        future = loop.create_future()
+        self._pending.append((index, model, query, limit, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _reset(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._pending.clear()
+        self._tasks.clear()
+        self._loop = loop
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = list(self._pending)
+        self._pending.clear()
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run(batch: list[tuple[Any, Any, str, int, asyncio.Future]]) -> None:
+        # queries can only share a search if they target the same index and model
+        groups: dict[tuple[int, int], list] = defaultdict(list)
+        for item in batch:
+            groups[id(item[0]), id(item[1])].append(item)
+
+        for items in groups.values():
+            index, model = items[0][0], items[0][1]
+            try:
+                query_np = await asyncio.to_thread(
+                    _encode, model, [item[2] for item in items]
+                )
+                distances, indices = await asyncio.to_thread(
+                    index.search, query_np, max(item[3] for item in items)
+                )
+            except Exception as exc:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for row, (*_, limit, future) in enumerate(items):
+                if not future.done():
+                    future.set_result((distances[row, :limit], indices[row, :limit]))
+
+
+_query_batcher = QueryBatcher()
+
+
 async def smart_search_smartapi(
     query: str, smartapi_ids: list[str], limit: int = 5
 ) -> dict[str, Any]:
     """Hybrid search over SmartAPI IDs using semantic or category routing."""
     if SEMANTIC_SEARCH_AVAILABLE:
         try:
-            index, ids, descriptions = _ensure_semantic_index(smartapi_ids)
-            model = _load_model()
-            query_embedding = model.encode([query])
+            index, ids, descriptions = await _ensure_semantic_index(smartapi_ids)
+            model = await _load_model()
             if np is None or faiss is None:
                 err_msg = "Semantic search dependencies unavailable."
                 raise RuntimeError(err_msg)
-            query_np = np.array(query_embedding, dtype="float32")
-            faiss.normalize_L2(query_np)
-            distances, indices = index.search(query_np, limit)
-
-            results: dict[str, dict[str, Any]] = {}
-            for score, idx in zip(distances[0], indices[0], strict=False):
-                if idx < 0 or idx >= len(ids):
-                    continue
-                api_id = ids[idx]
-                results[api_id] = {
-                    "score": float(score),
-                    "description": descriptions.get(api_id, ""),
-                }
+            distances, indices = await _query_batcher.submit(index, model, query, limit)
+
+            # FAISS pads missing hits with -1
+            valid = (indices >= 0) & (indices < len(ids))
+            scores = distances[valid].tolist()
+            cached_ids = _semantic_cache["ids_array"]
+            if cached_ids is not None and cached_ids[0] is ids:
+                ids_array = cached_ids[1]
+            else:
+                ids_array = np.asarray(ids, dtype=object)
+            chosen_ids = ids_array[indices[valid]].tolist()
+            results: dict[str, dict[str, Any]] = {
+                api_id: {"score": score, "description": descriptions.get(api_id, "")}
+                for api_id, score in zip(chosen_ids, scores, strict=True)
+            }
             if results:
                 return {
                     "method": "semantic_search",
@@ -224,7 +525,7 @@ async def smart_search_smartapi(
         except Exception as exc:
             logger.warning(f"Semantic search failed, falling back: {exc}")
 
-    category_results = _category_routing(query, smartapi_ids)
+    category_results = await _category_routing(query, smartapi_ids)
     return {
         "method": "category_routing",
         "results": category_results,
@@ -245,7 +546,7 @@ async def debug_search_smartapi(
             for api_id in api_ids[:limit]:
                 title = ""
                 try:
-                    spec = load_api_spec(api_id)
+                    spec = await aload_api_spec(api_id)
                     title = spec.get("info", {}).get("title", "")
                 except Exception as exc:  # pragma: no cover - network/spec errors
                     title = f"<failed to load spec: {exc}>"
@@ -261,7 +562,7 @@ async def debug_search_smartapi(
     for api_id, info in raw_results.items():
         title = ""
         try:
-            spec = load_api_spec(api_id)
+            spec = await aload_api_spec(api_id)
             title = spec.get("info", {}).get("title", "")
         except Exception as exc:  # pragma: no cover - network/spec errors
             title = f"<failed to load spec: {exc}>"
@@ -278,11 +579,63 @@ async def debug_search_smartapi(
     }
 
 
+async def _load_tools_into(
+    target: FastMCP, smartapi_ids: list[str], batch_name: str
+) -> tuple[int, int]:
+    """Load the given APIs and register their tools on target as they arrive.
+
+    Servers are created concurrently; each one's prefixed tools are queued
+    as soon as it is ready and registered by a consumer task, so tool
+    registration overlaps with fetching the remaining specs. APIs that fail
+    to load are logged and skipped. Returns (APIs loaded, tools registered).
+    """
+    from .server import get_mcp_server, merge_mcp_servers  # noqa: PLC0415
+
+    semaphore = asyncio.Semaphore(LOAD_TOOLS_CONCURRENCY)
+    queue: asyncio.Queue[Tool | None] = asyncio.Queue()
+    loaded = 0
+
+    async def produce(smartapi_id: str) -> None:
+        nonlocal loaded
+        async with semaphore:
+            try:
+                server = await get_mcp_server(smartapi_id)
+                # merging a single server applies the API-name tool prefix
+                merged = await merge_mcp_servers([server], batch_name)
+                tools = await merged.get_tools()
+            except Exception as exc:
+                logger.warning(f"Failed to load SmartAPI {smartapi_id}: {exc}")
+                return
+        loaded += 1
+        for tool in tools.values():
+            queue.put_nowait(tool)
+
+    async def consume() -> int:
+        registered = 0
+        while (tool := await queue.get()) is not None:
+            target.add_tool(tool)
+            registered += 1
+        return registered
+
+    consumer = asyncio.create_task(consume())
+    try:
+        await asyncio.gather(*(produce(sid) for sid in smartapi_ids))
+    finally:
+        queue.put_nowait(None)
+    return loaded, await consumer
+
+
 async def create_smart_router_server(
     smartapi_ids: list[str], server_name: str, max_tools: int
 ) -> FastMCP:
     """Create server with smart routing capabilities."""
     router_server = FastMCP(f"{server_name}-router")
+    if SEMANTIC_SEARCH_AVAILABLE:
+        # warm up the embedding model so the first search does not pay for it
+        try:
+            await _load_model()
+        except Exception as exc:
+            logger.warning(f"Failed to preload embedding model: {exc}")
 
     async def smart_search(query: str, limit: int = 5) -> str:
         result = await smart_search_smartapi(query, smartapi_ids, limit)
@@ -316,28 +669,18 @@ async def create_smart_router_server(
 
     async def load_tools_batch(api_ids: list[str]) -> str:
         """Load tools in batches to respect context limits."""
-        from .server import merge_mcp_servers  # noqa: PLC0415
-
         batch_ids = api_ids[:max_tools]
         if not batch_ids:
             return "No API IDs provided to load."
 
-        servers = []
-        for api_id in batch_ids:
-            try:
-                server = await _load_single_server(api_id)
-                servers.append(server)
-            except Exception as exc:  # pragma: no cover - network/spec errors
-                logger.warning(f"Failed to load SmartAPI {api_id}: {exc}")
+        loaded, registered = await _load_tools_into(
+            router_server, batch_ids, f"{server_name}-batch"
+        )
 
-        if not servers:
+        if not loaded:
             return "No tools loaded."
 
-        merged = await merge_mcp_servers(servers, f"{server_name}-batch")
-        tools = await merged.get_tools()
-        for tool in tools.values():
-            router_server.add_tool(tool)
-        return f"📦 Loaded {len(servers)} APIs with {len(tools)} tools."
+        return f"📦 Loaded {loaded} APIs with {registered} tools."
 
     router_server.add_tool(
         Tool.from_function(
@@ -361,28 +704,18 @@ async def create_progressive_server(
 
     async def load_tools_batch(api_ids: list[str]) -> str:
         """Load tools in batches to respect context limits."""
-        from .server import merge_mcp_servers  # noqa: PLC0415
-
         batch_ids = api_ids[:max_tools] if api_ids else smartapi_ids[:max_tools]
         if not batch_ids:
             return "No API IDs provided to load."
 
-        servers = []
-        for api_id in batch_ids:
-            try:
-                server = await _load_single_server(api_id)
-                servers.append(server)
-            except Exception as exc:  # pragma: no cover - network/spec errors
-                logger.warning(f"Failed to load SmartAPI {api_id}: {exc}")
+        loaded, registered = await _load_tools_into(
+            progressive_server, batch_ids, f"{server_name}-batch"
+        )
 
-        if not servers:
+        if not loaded:
             return "No tools loaded."
 
-        merged = await merge_mcp_servers(servers, f"{server_name}-batch")
-        tools = await merged.get_tools()
-        for tool in tools.values():
-            progressive_server.add_tool(tool)
-        return f"📦 Loaded {len(servers)} APIs with {len(tools)} tools."
+        return f"📦 Loaded {loaded} APIs with {registered} tools."
 
     progressive_server.add_tool(
         Tool.from_function(
@@ -396,9 +729,3 @@ async def create_progressive_server(
     )
 
     return progressive_server
-
-
-async def _load_single_server(api_id: str) -> FastMCP:
-    from .server import get_mcp_server  # noqa: PLC0415
-
-    return await get_mcp_server(api_id)
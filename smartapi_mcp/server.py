@@ -4,7 +4,7 @@ SmartAPI MCP Server
 Main MCP server implementation for SmartAPI integration.
 """
 
-import re
+import asyncio
 
 from awslabs.openapi_mcp_server import logger
 from awslabs.openapi_mcp_server.api.config import Config
@@ -16,25 +16,71 @@ from .router import create_progressive_server, create_smart_router_server
 
 # Import from smartapi module - avoiding circular imports
 from .smartapi import (
+    aload_api_spec,
+    aload_api_specs,
+    cached_spec_path,
     get_base_server_url,
     get_predefined_api_set,
     get_smartapi_ids,
-    load_api_spec,
+    sanitize_api_name,
     smartapi_spec_url,
 )
 
 
 async def get_mcp_server(smartapi_id: str) -> FastMCP:
-    config = Config(
-        api_spec_url=smartapi_spec_url.format(smartapi_id=smartapi_id),
-    )
-    openapi_spec = load_api_spec(smartapi_id)
+    openapi_spec = await aload_api_spec(smartapi_id)
+    # Point awslabs at the copy aload_api_spec saved, so the spec is not
+    # downloaded a second time; fall back to the URL if it could not be saved.
+    spec_path = cached_spec_path(smartapi_id)
+    if spec_path is not None:
+        config = Config(api_spec_path=str(spec_path))
+    else:
+        config = Config(
+            api_spec_url=smartapi_spec_url.format(smartapi_id=smartapi_id),
+        )
     base_server_url = get_base_server_url(openapi_spec)
     config.api_base_url = base_server_url
 
     return await create_mcp_server_async(config)
 
 
+async def load_mcp_servers(
+    smartapi_ids: list[str], max_concurrency: int = 16
+) -> list[FastMCP]:
+    """
+    Create MCP servers for the given SmartAPI IDs concurrently.
+
+    All specs are fetched up front in one concurrent batch, then at most
+    max_concurrency servers are created at once from the cached specs. APIs
+    that fail to load are logged and skipped; the returned servers keep the
+    input order.
+    """
+    specs = await aload_api_specs(smartapi_ids)
+    for smartapi_id, spec in specs.items():
+        if isinstance(spec, BaseException):
+            logger.warning(f"Failed to load SmartAPI {smartapi_id}: {spec}")
+    smartapi_ids = [
+        sid for sid in smartapi_ids if not isinstance(specs[sid], BaseException)
+    ]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _load(smartapi_id: str) -> FastMCP:
+        async with semaphore:
+            return await get_mcp_server(smartapi_id)
+
+    results = await asyncio.gather(
+        *(_load(sid) for sid in smartapi_ids), return_exceptions=True
+    )
+    servers = []
+    for smartapi_id, result in zip(smartapi_ids, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.warning(f"Failed to load SmartAPI {smartapi_id}: {result}")
+            continue
+        servers.append(result)
+    return servers
+
+
 async def merge_mcp_servers(
     list_of_servers: list[FastMCP], merged_name: str = "merged_mcp"
 ) -> FastMCP:
@@ -54,9 +100,7 @@ async def merge_mcp_servers(
     merged_mcp = FastMCP(merged_name)
 
     for server in list_of_servers:
-        api_name = re.sub(
-            r"[^a-z0-9_-]", "_", getattr(server, "name", "unknown_api").lower()
-        )
+        api_name = sanitize_api_name(getattr(server, "name", "unknown_api"))
 
         tools = await server.get_tools()
         if tools:
@@ -111,16 +155,15 @@ async def get_merged_mcp_server(
     if smartapi_id:
         smartapi_ids = [smartapi_id]
     if smartapi_ids:
-        smartapi_ids = list(set(smartapi_ids))
+        # dedupe while keeping the caller's order
+        smartapi_ids = list(dict.fromkeys(smartapi_ids))
     if not smartapi_ids:
         err_msg = "No SmartAPI IDs provided or found with the given query."
         raise ValueError(err_msg)
-    smartapi_exclude_ids = smartapi_exclude_ids or []
-    list_of_servers = [
-        await get_mcp_server(sid)
-        for sid in smartapi_ids
-        if sid not in smartapi_exclude_ids
-    ]
+    excluded_ids = frozenset(smartapi_exclude_ids or ())
+    list_of_servers = await load_mcp_servers(
+        [sid for sid in smartapi_ids if sid not in excluded_ids]
+    )
     merged_server = await merge_mcp_servers(list_of_servers, server_name)
     logger.info(f"Merged {len(list_of_servers)} APIs into one MCP server.")
     return merged_server
@@ -165,7 +208,10 @@ async def get_smart_mcp_server_with_routing(
         raise ValueError(err_msg)
 
     smartapi_exclude_ids = smartapi_exclude_ids or []
-    available_ids = [sid for sid in smartapi_ids if sid not in smartapi_exclude_ids]
+    excluded_ids = frozenset(smartapi_exclude_ids)
+    available_ids = [
+        sid for sid in dict.fromkeys(smartapi_ids) if sid not in excluded_ids
+    ]
 
     large_api_threshold = 50
     medium_api_threshold = 10
@@ -184,12 +230,10 @@ async def get_smart_mcp_server_with_routing(
             available_ids, server_name, max_context_tools
         )
 
-    # Default to full loading for small sets
+    # Default to full loading for small sets; the IDs are already resolved,
+    # so pass them alone rather than re-querying the registry
     logger.info("🔧 Using full loading for small API set")
     return await get_merged_mcp_server(
-        smartapi_q=smartapi_q,
         smartapi_ids=available_ids,
-        smartapi_exclude_ids=smartapi_exclude_ids,
-        api_set=api_set,
         server_name=server_name,
     )
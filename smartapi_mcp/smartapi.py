@@ -4,7 +4,16 @@ SmartAPI Registry Integration
 Handles interaction with the SmartAPI registry.
 """
 
-import re
+import asyncio
+import email.utils
+import functools
+import importlib.util
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from pathlib import Path
 
 import httpx
 from awslabs.openapi_mcp_server import logger
@@ -12,104 +21,505 @@ from awslabs.openapi_mcp_server.api.config import Config
 from awslabs.openapi_mcp_server.utils.openapi import load_openapi_spec
 from awslabs.openapi_mcp_server.utils.openapi_validator import validate_openapi_spec
 
+from . import __version__
+
+try:  # faster JSON parsing for large OpenAPI specs; stdlib json as fallback
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency path
+    orjson = None  # type: ignore[assignment]
+
 smartapi_query_url = "https://smart-api.info/api/query?q={q}&fields=_id&size=500&raw=1"
 smartapi_spec_url = "https://smart-api.info/api/metadata/{smartapi_id}"
 
+# byte translation table used to derive an API name from its title: every
+# byte outside [a-z0-9_-] maps to "_"
+_ALLOWED_NAME_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyz0123456789_-")
+_SANITIZE_TABLE = bytes(c if c in _ALLOWED_NAME_BYTES else ord("_") for c in range(256))
+
+# retries of transient registry failures (5xx, network errors), with
+# equal-jitter exponential backoff starting at RETRY_BASE_DELAY seconds;
+# a server's Retry-After is honoured up to RETRY_MAX_DELAY seconds
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Shared registry client, so repeated lookups reuse pooled connections instead
+# of paying a TCP+TLS handshake per call. Bound to the event loop it was
+# created in, since pooled connections cannot move between loops.
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+# aclose() tasks for clients left behind by an earlier event loop
+_closing_tasks: set[asyncio.Task] = set()
+
+# get_smartapi_ids results, keyed by query string, as (fetch time, IDs);
+# entries expire after QUERY_CACHE_TTL seconds, least recently used first
+# beyond QUERY_CACHE_SIZE
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_SIZE = 64
+_query_cache: OrderedDict[str, tuple[float, tuple[str, ...]]] = OrderedDict()
+
+# Specs fetched by aload_api_spec, keyed by SmartAPI ID
+_spec_cache: dict[str, dict] = {}
+# Spec fetches currently in progress, keyed by SmartAPI ID
+_inflight_specs: dict[str, asyncio.Task] = {}
+
+# On-disk spec cache. Each {id}.json spec may have an {id}.meta.json with the
+# validators (ETag, Last-Modified) and Cache-Control expiry it was served with:
+# fresh copies are used without a request, stale ones are revalidated.
+SPEC_CACHE_DIR = Path.home() / ".smartapi_mcp" / "specs"
+
+
+@functools.lru_cache(maxsize=1024)
+def sanitize_api_name(name: str) -> str:
+    """Lowercase name and replace characters outside [a-z0-9_-] with "_".
+
+    Results are memoized, since the same API names recur on every merge.
+    """
+    # non-ASCII characters become "?" (one per character), then "_"
+    return (
+        name.lower()
+        .encode("ascii", "replace")
+        .translate(_SANITIZE_TABLE)
+        .decode("ascii")
+    )
+
+
+def json_loads(data: bytes | str):
+    """Parse JSON with orjson when installed, falling back to the stdlib."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _new_client() -> httpx.AsyncClient:
+    """Create an httpx client configured for the SmartAPI registry."""
+    return httpx.AsyncClient(
+        # identify ourselves to the registry; httpx already asks for
+        # gzip/deflate-compressed responses by default
+        headers={
+            "User-Agent": f"smartapi-mcp/{__version__} httpx/{httpx.__version__}",
+            "Accept": "application/json",
+        },
+        # HTTP/2 needs the optional h2 package (httpx[http2])
+        http2=importlib.util.find_spec("h2") is not None,
+        # large specs can take a while to download, but connecting or
+        # waiting for a pooled connection should fail fast
+        timeout=httpx.Timeout(connect=5.0, read=15.0, write=5.0, pool=5.0),
+        limits=httpx.Limits(
+            max_connections=50,
+            max_keepalive_connections=20,
+            keepalive_expiry=30.0,
+        ),
+    )
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared registry client, creating it for the running loop."""
+    global _client, _client_loop  # noqa: PLW0603
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if _client is not None and not _client.is_closed:
+            _discard_client(_client, _client_loop)
+        _client = _new_client()
+        _client_loop = loop
+    return _client
+
+
+def _discard_client(
+    client: httpx.AsyncClient, client_loop: asyncio.AbstractEventLoop | None
+) -> None:
+    """Close a client bound to another event loop without blocking this one."""
+    if client_loop is not None and client_loop.is_running():
+        # its pooled connections belong to that loop, so close them there
+        asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as exc:  # transports of a closed loop may fail to close
+        logger.debug(f"Failed to close stale registry client: {exc}")
+
+
+async def close_client() -> None:
+    """Close the shared registry client and its connection pool."""
+    global _client, _client_loop  # noqa: PLW0603
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def _validate_spec(api_spec: dict, *, validate: bool | None = None) -> None:
+    """Warn if api_spec is not a valid OpenAPI spec.
+
+    When validate is None, validation runs unless SMARTAPI_SKIP_VALIDATE=1,
+    which lets trusted deployments skip it at startup.
+    """
+    if validate is None:
+        validate = os.environ.get("SMARTAPI_SKIP_VALIDATE") != "1"
+    if validate and not validate_openapi_spec(api_spec):
+        logger.warning("OpenAPI specification validation failed, but continuing anyway")
+
+
+def _read_cached_spec(smartapi_id: str) -> tuple[dict, bytes] | None:
+    """Return the cached (metadata, spec bytes) for a SmartAPI ID, if any."""
+    spec_file = SPEC_CACHE_DIR / f"{smartapi_id}.json"
+    meta_file = SPEC_CACHE_DIR / f"{smartapi_id}.meta.json"
+    try:
+        return json_loads(meta_file.read_bytes()), spec_file.read_bytes()
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_metadata(headers: httpx.Headers) -> dict:
+    """Return the cache validators and expiry time from response headers."""
+    meta = {}
+    if etag := headers.get("ETag"):
+        meta["etag"] = etag
+    if last_modified := headers.get("Last-Modified"):
+        meta["last_modified"] = last_modified
+    max_age = None
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.lower()
+        if name in {"no-cache", "no-store"}:
+            max_age = None
+            break
+        if name == "max-age" and value.isdigit():
+            max_age = int(value)
+    if max_age:
+        meta["expires"] = time.time() + max_age
+    return meta
+
+
+def _write_cached_spec(
+    smartapi_id: str, meta: dict, content: bytes | None = None
+) -> None:
+    """Save a spec and its cache metadata; content=None updates metadata only."""
+    try:
+        SPEC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        if content is not None:
+            (SPEC_CACHE_DIR / f"{smartapi_id}.json").write_bytes(content)
+        meta_file = SPEC_CACHE_DIR / f"{smartapi_id}.meta.json"
+        if meta:
+            meta_file.write_bytes(json_dumps(meta))
+        else:
+            # without validators or an expiry the copy on disk cannot be reused
+            meta_file.unlink(missing_ok=True)
+    except OSError as exc:
+        logger.debug(f"Failed to cache API spec for {smartapi_id}: {exc}")
+
+
+def cached_spec_path(smartapi_id: str) -> Path | None:
+    """Return the on-disk copy of a spec fetched by aload_api_spec, if any."""
+    spec_file = SPEC_CACHE_DIR / f"{smartapi_id}.json"
+    return spec_file if spec_file.is_file() else None
+
+
+def _parse_retry_after(value: str) -> float | None:
+    """Return the delay in seconds from a Retry-After header, if valid."""
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+async def _get_with_retry(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """GET url, retrying transient failures with equal-jitter backoff.
+
+    Server errors and network errors are retried up to MAX_RETRIES times,
+    honouring Retry-After (capped at RETRY_MAX_DELAY) when the server sends
+    one; client errors are raised immediately.
+    """
+    for attempt in range(MAX_RETRIES):
+        delay = None
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            if not exc.response.is_server_error:
+                raise
+            retry_after = exc.response.headers.get("Retry-After")
+            if retry_after:
+                delay = _parse_retry_after(retry_after)
+                if delay is not None:
+                    delay = min(delay, RETRY_MAX_DELAY)
+        except httpx.TransportError:
+            pass
+        else:
+            return response
+        if delay is None:
+            # equal jitter: half the backoff is fixed, half is random
+            backoff = RETRY_BASE_DELAY * 2**attempt
+            delay = backoff / 2 + random.uniform(0, backoff / 2)  # noqa: S311
+        logger.debug(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1})")
+        await asyncio.sleep(delay)
+    response = await client.get(url)
+    response.raise_for_status()
+    return response
+
 
 async def get_smartapi_ids(q: str) -> list[str]:
-    """Give a query string, return a list of SmartAPI IDs matching the query."""
+    """Give a query string, return a list of SmartAPI IDs matching the query.
+
+    Results are cached per process for QUERY_CACHE_TTL seconds, unless the
+    registry responds with Cache-Control: no-cache or no-store.
+    """
+    return await _query_smartapi_ids(_get_client(), q)
+
+
+async def _query_smartapi_ids(client: httpx.AsyncClient, q: str) -> list[str]:
+    now = time.monotonic()
+    cached = _query_cache.get(q)
+    if cached is not None and now - cached[0] < QUERY_CACHE_TTL:
+        _query_cache.move_to_end(q)
+        return list(cached[1])
+
     _url = smartapi_query_url.format(q=q)
+    response = await _get_with_retry(client, _url)
+    data = json_loads(response.content)
+    smartapi_ids = [api["_id"] for api in data["hits"]]
 
-    smartapi_ids = []
-    async with httpx.AsyncClient() as client:
-        response = await client.get(_url)
-        response.raise_for_status()
-        data = response.json()
-        for api in data["hits"]:
-            smartapi_id = api["_id"]
-            smartapi_ids.append(smartapi_id)
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        _query_cache.pop(q, None)
+    else:
+        _query_cache[q] = (now, tuple(smartapi_ids))
+        _query_cache.move_to_end(q)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
     return smartapi_ids
 
 
-def load_api_spec(smartapi_id: str) -> dict:
+@functools.lru_cache(maxsize=128)
+def load_api_spec(smartapi_id: str, *, validate: bool | None = None) -> dict:
+    """Fetch and validate the OpenAPI spec of a SmartAPI ID.
+
+    Pass validate=False (or set SMARTAPI_SKIP_VALIDATE=1) to skip validation.
+    Results are memoized per process; the returned dict is shared between
+    callers and must not be mutated. A spec already fetched by aload_api_spec,
+    which validates it on download, is reused without refetching or
+    revalidating it.
+    """
+    api_spec = _spec_cache.get(smartapi_id)
+    if api_spec is not None:
+        return api_spec
     config = Config(
         api_spec_url=smartapi_spec_url.format(smartapi_id=smartapi_id),
     )
     api_spec = load_openapi_spec(url=config.api_spec_url)
+    _validate_spec(api_spec, validate=validate)
+    return api_spec
 
-    # Validate the OpenAPI spec
-    if not validate_openapi_spec(api_spec):
-        logger.warning("OpenAPI specification validation failed, but continuing anyway")
 
+async def aload_api_spec(
+    smartapi_id: str, client: httpx.AsyncClient | None = None
+) -> dict:
+    """Async variant of load_api_spec, fetching the spec with httpx.
+
+    Fetched specs are cached per process, so repeated lookups of the same
+    SmartAPI ID (e.g. router descriptions, then server creation) hit the
+    network only once. Fetched specs are also written to SPEC_CACHE_DIR:
+    across runs they are reused without a request while their
+    Cache-Control max-age lasts, then revalidated with If-None-Match and
+    If-Modified-Since, so unchanged specs are not re-downloaded. Pass a shared client
+    to fetch many specs concurrently. Concurrent lookups of the same ID
+    share a single in-flight request.
+    """
+    if smartapi_id in _spec_cache:
+        return _spec_cache[smartapi_id]
+
+    task = _inflight_specs.get(smartapi_id)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_api_spec(smartapi_id, client))
+        _inflight_specs[smartapi_id] = task
+        task.add_done_callback(lambda _: _inflight_specs.pop(smartapi_id, None))
+    # shield the shared fetch, so one cancelled caller does not cancel it
+    # for the others
+    return await asyncio.shield(task)
+
+
+async def _fetch_api_spec(
+    smartapi_id: str, client: httpx.AsyncClient | None = None
+) -> dict:
+    _url = smartapi_spec_url.format(smartapi_id=smartapi_id)
+    cached = _read_cached_spec(smartapi_id)
+    if cached and cached[0].get("expires", 0) > time.time():
+        # still fresh per Cache-Control: max-age, skip the request entirely
+        api_spec = json_loads(cached[1])
+        _spec_cache[smartapi_id] = api_spec
+        return api_spec
+
+    headers = {}
+    if cached and "etag" in cached[0]:
+        headers["If-None-Match"] = cached[0]["etag"]
+    if cached and "last_modified" in cached[0]:
+        headers["If-Modified-Since"] = cached[0]["last_modified"]
+    if client is None:
+        client = _get_client()
+    response = await client.get(_url, headers=headers)
+
+    if cached and response.status_code == httpx.codes.NOT_MODIFIED:
+        api_spec = json_loads(cached[1])
+        # a 304 may carry a new expiry and validators
+        meta = {**cached[0], **_cache_metadata(response.headers)}
+        _write_cached_spec(smartapi_id, meta)
+    else:
+        response.raise_for_status()
+        api_spec = json_loads(response.content)
+
+        _validate_spec(api_spec)
+        _write_cached_spec(
+            smartapi_id, _cache_metadata(response.headers), response.content
+        )
+
+    _spec_cache[smartapi_id] = api_spec
     return api_spec
 
 
+async def aload_api_specs(
+    smartapi_ids: list[str], client: httpx.AsyncClient | None = None
+) -> dict[str, dict | BaseException]:
+    """Fetch the specs of many SmartAPI IDs concurrently.
+
+    Requests share one pooled client (the shared registry client by default),
+    so their round trips overlap on reused connections. Returns a dict
+    mapping each ID to its spec, or to the exception raised while fetching it.
+    """
+    if client is None:
+        client = _get_client()
+    results = await asyncio.gather(
+        *(aload_api_spec(sid, client) for sid in smartapi_ids),
+        return_exceptions=True,
+    )
+    return dict(zip(smartapi_ids, results, strict=True))
+
+
+class AsyncSmartAPIClient:
+    """A SmartAPI registry session with its own connection pool.
+
+    Use it as an async context manager so the pool is closed on exit::
+
+        async with AsyncSmartAPIClient() as registry:
+            ids = await registry.get_ids("tags.name:biothings")
+            specs = await registry.load_specs(ids)
+
+    The module-level functions (get_smartapi_ids, aload_api_spec, ...) keep
+    using a shared client instead.
+    """
+
+    def __init__(self, client: httpx.AsyncClient | None = None) -> None:
+        self._client = client if client is not None else _new_client()
+
+    async def __aenter__(self) -> "AsyncSmartAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def get_ids(self, q: str) -> list[str]:
+        """Return the SmartAPI IDs matching the query string."""
+        return await _query_smartapi_ids(self._client, q)
+
+    async def load_spec(self, smartapi_id: str) -> dict:
+        """Return the OpenAPI spec of a SmartAPI ID."""
+        return await aload_api_spec(smartapi_id, self._client)
+
+    async def load_specs(
+        self, smartapi_ids: list[str]
+    ) -> dict[str, dict | BaseException]:
+        """Fetch the specs of many SmartAPI IDs concurrently."""
+        return await aload_api_specs(smartapi_ids, self._client)
+
+
 def get_base_server_url(api_spec: dict) -> str:
     """Return the base server URL for the given API specification."""
-    api_name = re.sub(r"[^a-z0-9_-]", "_", api_spec["info"]["title"].lower())
-    base_server_url = None
-    if len(api_spec["servers"]) == 1:
-        base_server_url = api_spec["servers"][0]["url"]
-    elif len(api_spec["servers"]) > 1:
-        for server in api_spec["servers"]:
-            server_desc = server.get("description", "")
-            if "ci.transltr.io" in server["url"].lower():
-                base_server_url = server["url"]
-                break
-            if (
-                "Production server on https" in server_desc
-                or "Production" in server_desc
+    servers = api_spec["servers"]
+    # fast path: most SmartAPI specs list a single server
+    if len(servers) == 1 and (base_server_url := servers[0]["url"]):
+        return base_server_url
+    if len(servers) > 1:
+        # the first CI (ci.transltr.io) or production server wins;
+        # "Production" also covers "Production server on https"
+        for server in servers:
+            url = server["url"]
+            if url and (
+                "ci.transltr.io" in url.lower()
+                or "Production" in (server.get("description") or "")
             ):
-                base_server_url = server["url"]
-                break
-    if not base_server_url:
-        err_msg = "Cannot determine server URL for API: {}\n{}"
-        err_msg = err_msg.format(api_name, api_spec["servers"])
-        raise ValueError(err_msg)
-    return base_server_url
+                return url
+    api_name = sanitize_api_name(api_spec["info"]["title"])
+    err_msg = "Cannot determine server URL for API: {}\n{}"
+    err_msg = err_msg.format(api_name, servers)
+    raise ValueError(err_msg)
 
 
 PREDEFINED_API_SETS = ["biothings_core", "biothings_test", "biothings_all"]
 
+BIOTHINGS_CORE_IDS: tuple[str, ...] = (
+    "59dce17363dce279d389100834e43648",  # MyGene.info
+    "09c8782d9f4027712e65b95424adba79",  # MyVariant.info
+    "8f08d1446e0bb9c2b323713ce83e2bd3",  # MyChem.info
+    "671b45c0301c8624abbd26ae78449ca2",  # MyDisease.info
+    "85139f4dccfcefa3ac3042372066916d",  # MyGeneSet.info
+)
+# biothings core APIs plus the SemmedDB API, useful for testings
+BIOTHINGS_TEST_IDS: tuple[str, ...] = (
+    *BIOTHINGS_CORE_IDS,
+    "1d288b3a3caf75d541ffaae3aab386c8",  # SemmedDB
+)
+BIOTHINGS_ALL_QUERY = (
+    "_status.uptime_status:pass AND tags.name=biothings AND NOT tags.name=trapi"
+)
+# in declaration order for the API set; the frozenset is for membership checks
+_BIOTHINGS_ALL_EXCLUDED_ID_LIST: tuple[str, ...] = (
+    "1c9be9e56f93f54192dcac203f21c357",  # BioThings mabs API
+    "5a4c41bf2076b469a0e9cfcf2f2b8f29",  # Translator Annotation Service
+    "cc857d5b7c8b7609b5bbb38ff990bfff",  # GO Biological Process API
+    "f339b28426e7bf72028f60feefcd7465",  # GO Cellular Component API
+    "34bad236d77bea0a0ee6c6cba5be54a6",  # GO Molecular Function API
+)
+BIOTHINGS_ALL_EXCLUDED_IDS: frozenset[str] = frozenset(_BIOTHINGS_ALL_EXCLUDED_ID_LIST)
+
+
+# arguments of each predefined API set, built once at import; sequences are
+# kept as tuples and copied to fresh lists by get_predefined_api_set
+_API_SET_ARGS: dict[str, dict[str, str | tuple[str, ...]]] = {
+    "biothings_core": {"smartapi_ids": BIOTHINGS_CORE_IDS},
+    "biothings_test": {"smartapi_ids": BIOTHINGS_TEST_IDS},
+    # include all biothings APIs with a few excluded
+    "biothings_all": {
+        "smartapi_q": BIOTHINGS_ALL_QUERY,
+        "smartapi_exclude_ids": _BIOTHINGS_ALL_EXCLUDED_ID_LIST,
+    },
+}
+
 
 def get_predefined_api_set(api_set: str) -> dict:
     """Return the predefined API set for the given set name."""
-    if api_set == "biothings_core":
-        return {
-            "smartapi_ids": [
-                "59dce17363dce279d389100834e43648",  # MyGene.info
-                "09c8782d9f4027712e65b95424adba79",  # MyVariant.info
-                "8f08d1446e0bb9c2b323713ce83e2bd3",  # MyChem.info
-                "671b45c0301c8624abbd26ae78449ca2",  # MyDisease.info
-                "85139f4dccfcefa3ac3042372066916d",  # MyGeneSet.info
-            ]
-        }
-    if api_set == "biothings_test":
-        # biothings core APIs plus the SemmedDB API, useful for testings
-        return {
-            "smartapi_ids": [
-                "59dce17363dce279d389100834e43648",  # MyGene.info
-                "09c8782d9f4027712e65b95424adba79",  # MyVariant.info
-                "8f08d1446e0bb9c2b323713ce83e2bd3",  # MyChem.info
-                "671b45c0301c8624abbd26ae78449ca2",  # MyDisease.info
-                "85139f4dccfcefa3ac3042372066916d",  # MyGeneSet.info
-                "1d288b3a3caf75d541ffaae3aab386c8",  # SemmedDB
-            ]
-        }
-    if api_set == "biothings_all":
-        # include all biothings APIs with a few excluded
+    args = _API_SET_ARGS.get(api_set)
+    if args is not None:
         return {
-            "smartapi_q": (
-                "_status.uptime_status:pass AND tags.name=biothings AND"
-                " NOT tags.name=trapi"
-            ),
-            "smartapi_exclude_ids": [
-                "1c9be9e56f93f54192dcac203f21c357",  # BioThings mabs API
-                "5a4c41bf2076b469a0e9cfcf2f2b8f29",  # Translator Annotation Service
-                "cc857d5b7c8b7609b5bbb38ff990bfff",  # GO Biological Process API
-                "f339b28426e7bf72028f60feefcd7465",  # GO Cellular Component API
-                "34bad236d77bea0a0ee6c6cba5be54a6",  # GO Molecular Function API
-            ],
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in args.items()
         }
     err_msg = f"Unknown API set: {api_set}"
     raise ValueError(err_msg)
@@ -0,0 +1,239 @@
+"""
+Shared pytest fixtures for the smartapi_mcp test suite.
+"""
+
+import asyncio
+import copy
+from dataclasses import dataclass
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock
+from urllib.parse import quote
+
+import pytest
+import pytest_asyncio
+from fastmcp.tools import Tool
+
+import smartapi_mcp.smartapi
+from smartapi_mcp.config import Config
+from smartapi_mcp.smartapi import BIOTHINGS_TEST_IDS
+
+try:  # faster event loop for the async tests; stdlib asyncio as fallback
+    import uvloop
+except ImportError:  # pragma: no cover - optional dependency path
+    uvloop = None
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-network",
+        action="store_true",
+        default=False,
+        help="run the tests marked network, against the live SmartAPI registry",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-network"):
+        return
+    skip_network = pytest.mark.skip(reason="needs --run-network")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip_network)
+
+
+if uvloop is not None:
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_asyncio_loop_factories():
+        """Run the async tests on uvloop.
+
+        Older pytest-asyncio versions without this hook use the stdlib loop.
+        """
+        return {"uvloop": uvloop.new_event_loop}
+
+
+@dataclass
+class CLIPatches:
+    """Stand-ins for the collaborators that ``smartapi_mcp.cli.main`` calls."""
+
+    asyncio: SimpleNamespace
+    get_merged_mcp_server: AsyncMock
+    get_all_counts: AsyncMock
+    setup_signal_handlers: Mock
+    load_config: Mock
+
+
+@pytest.fixture(scope="session")
+def cli_module():
+    """Import ``smartapi_mcp.cli`` once per session (once per xdist worker)."""
+    import smartapi_mcp.cli  # noqa: PLC0415
+
+    return smartapi_mcp.cli
+
+
+@pytest.fixture(scope="session")
+def _config_template():
+    """Build the default CLI config once for the whole session.
+
+    A real ``Config`` rather than a mock, so the tests only ever see
+    attributes the CLI can actually be handed.
+    """
+    config = Config(host="localhost", port=8000)
+    config.server_name = "smartapi_mcp"
+    return config
+
+
+@pytest.fixture
+def cli_patches(monkeypatch, _config_template):
+    """Swap the CLI's collaborators for mocks by direct attribute assignment.
+
+    main() imports these lazily, so they are replaced on the modules they are
+    imported from. ``asyncio.run`` wraps the real function, so by default the
+    startup coroutine runs against the async mocks; set its ``return_value``
+    or ``side_effect`` to skip the event loop entirely. ``load_config``
+    returns a copy of the session's default config.
+    """
+    patches = CLIPatches(
+        asyncio=SimpleNamespace(run=Mock(wraps=asyncio.run)),
+        get_merged_mcp_server=AsyncMock(),
+        get_all_counts=AsyncMock(return_value=(0, 1, 0, 0)),
+        setup_signal_handlers=Mock(),
+        load_config=Mock(return_value=copy.copy(_config_template)),
+    )
+    monkeypatch.setattr(asyncio, "run", patches.asyncio.run)
+    monkeypatch.setattr(
+        "smartapi_mcp.server.get_merged_mcp_server", patches.get_merged_mcp_server
+    )
+    monkeypatch.setattr(
+        "awslabs.openapi_mcp_server.server.get_all_counts", patches.get_all_counts
+    )
+    monkeypatch.setattr(
+        "smartapi_mcp.cli.setup_signal_handlers", patches.setup_signal_handlers
+    )
+    monkeypatch.setattr("smartapi_mcp.config.load_config", patches.load_config)
+    return patches
+
+
+@pytest.fixture
+def mock_config(cli_patches):
+    """The per-test config returned by ``load_config``.
+
+    Override only the attributes a test cares about.
+    """
+    return cli_patches.load_config.return_value
+
+
+@pytest.fixture
+def make_mock_server():
+    """Factory for mock FastMCP servers with the given tools and prompts.
+
+    tools is a dict of tool objects, or a list of names to build real
+    fastmcp Tools for (e.g. to add them to a real FastMCP server).
+    """
+
+    def _make(name, tools=None, prompts=None):
+        if isinstance(tools, list):
+            tools = {tool_name: _make_tool(tool_name) for tool_name in tools}
+        server = MagicMock()
+        server.name = name
+        server.get_tools = AsyncMock(return_value=tools or {})
+        server.get_prompts = AsyncMock(return_value=prompts or {})
+        return server
+
+    return _make
+
+
+def _make_tool(name):
+    """A real fastmcp Tool named name, wrapping a plain function."""
+
+    def lookup(query: str) -> str:
+        return query
+
+    return Tool.from_function(lookup, name=name)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session", autouse=True)
+async def _shared_registry_client():
+    """Close the registry client shared by the session's tests at the end.
+
+    All async tests run on the session loop (see pyproject.toml), so the
+    client ``_get_client`` creates keeps its pooled connections from test to
+    test instead of being rebuilt per test loop.
+    """
+    yield
+    await smartapi_mcp.smartapi.close_client()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session", autouse=True)
+async def _prefetch_specs(request, _shared_registry_client):
+    """With --run-network, fetch every spec the live tests use up front.
+
+    The biothings_test specs (a superset of those the tests build servers
+    for) are fetched concurrently in one batch, so the tests themselves only
+    parse them. Failed fetches are left for the tests to report.
+    """
+    if request.config.getoption("--run-network"):
+        await smartapi_mcp.smartapi.aload_api_specs(list(BIOTHINGS_TEST_IDS))
+
+
+@pytest.fixture(scope="session")
+def _registry_memo(request):
+    """Memoized stand-ins for the SmartAPI registry lookups.
+
+    Results are kept in memory for the session and persisted to pytest's
+    cache directory (``.pytest_cache/v/smartapi/``), so later runs skip the
+    network entirely; ``pytest --cache-clear`` refetches them.
+    """
+    # no cache directory under -p no:cacheprovider
+    cache = getattr(request.config, "cache", None)
+    memo = {}
+    load_openapi_spec = smartapi_mcp.smartapi.load_openapi_spec
+    query_smartapi_ids = smartapi_mcp.smartapi._query_smartapi_ids
+
+    def lookup(key):
+        if key not in memo and cache is not None:
+            value = cache.get(key, None)
+            if value is not None:
+                memo[key] = value
+        return memo.get(key)
+
+    def store(key, value):
+        memo[key] = value
+        if cache is not None:
+            cache.set(key, value)
+        return value
+
+    def cached_load_openapi_spec(url, **kwargs):
+        key = f"smartapi/spec/{quote(url, safe='')}"
+        api_spec = lookup(key)
+        if api_spec is None:
+            api_spec = store(key, load_openapi_spec(url=url, **kwargs))
+        return api_spec
+
+    async def cached_query_smartapi_ids(client, q):
+        key = f"smartapi/query/{quote(q, safe='')}"
+        smartapi_ids = lookup(key)
+        if smartapi_ids is None:
+            smartapi_ids = store(key, await query_smartapi_ids(client, q))
+        return list(smartapi_ids)
+
+    return SimpleNamespace(
+        load_openapi_spec=cached_load_openapi_spec,
+        query_smartapi_ids=cached_query_smartapi_ids,
+    )
+
+
+@pytest.fixture
+def registry_cache(monkeypatch, _registry_memo):
+    """Serve live SmartAPI spec and query lookups from the on-disk memo.
+
+    Only for tests against the real registry; tests that stub the HTTP
+    client or the spec loader must not use it.
+    """
+    monkeypatch.setattr(
+        smartapi_mcp.smartapi, "load_openapi_spec", _registry_memo.load_openapi_spec
+    )
+    monkeypatch.setattr(
+        smartapi_mcp.smartapi, "_query_smartapi_ids", _registry_memo.query_smartapi_ids
+    )
+    return _registry_memo
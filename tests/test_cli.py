@@ -14,573 +14,267 @@ testing all aspects of command-line interface functionality including:
 The tests use extensive mocking to isolate CLI functionality from external
 dependencies like actual API calls and server startup.
 
-Test Coverage Areas:
-- TestCLI: Main functionality tests
-- TestCLIEdgeCases: Error conditions and edge cases
-
-Key Mock Dependencies:
+Key Mock Dependencies (swapped in by the cli_patches fixture in conftest.py):
+- asyncio.run: Wraps the real event loop runner
 - get_merged_mcp_server: Mocked server creation
 - get_all_counts: Mocked resource counting
 - setup_signal_handlers: Mocked signal setup
-- logger: Mocked logging calls
+- load_config: Mocked configuration loading
 """
 
-import argparse
-from unittest.mock import MagicMock, patch
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock
 
 import pytest
 
-from smartapi_mcp.cli import main
-
-
-class TestCLI:
-    """Test cases for CLI functionality."""
-
-    def test_argument_parser_default_values(self):
-        """Test that argument parser sets correct default values."""
-        with patch("sys.argv", ["smartapi-mcp"]):
-            parser = argparse.ArgumentParser(
-                description=(
-                    "Create MCP tools based on multiple registered SmartAPI APIs."
-                )
-            )
-            parser.add_argument("--api_set", help="the set of predefined SmartAPI APIs")
-            parser.add_argument("--transport", help="The mode of MCP server")
-            parser.add_argument("--port", type=int, default=8001, help="HTTP port")
-
-            args = parser.parse_args([])
-            assert args.api_set is None
-            assert args.transport is None
-            assert args.port == 8001
-
-    def test_argument_parser_with_values(self):
-        """Test argument parser with provided values."""
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--api_set")
-        parser.add_argument("--transport")
-        parser.add_argument("--port", type=int, default=8001)
-
-        args = parser.parse_args(
-            ["--api_set", "biothings_core", "--transport", "http", "--port", "9000"]
-        )
-
-        assert args.api_set == "biothings_core"
-        assert args.transport == "http"
-        assert args.port == 9000
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.setup_signal_handlers")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--api_set", "biothings_core"])
-    def test_main_biothings_core_stdio_mode(
-        self,
-        mock_load_config,
-        mock_setup_signals,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function with biothings_core API set and stdio mode."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = "biothings_core"
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = None
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]  # Use list to make it mutable in nested function
-
-        # Mock asyncio.run to return the expected values
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (1, 5, 3, 2)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main
-        main()
-
-        # Verify config was loaded
-        mock_load_config.assert_called_once()
-
-        # Verify asyncio.run was called twice (for server creation and count retrieval)
-        assert mock_asyncio.run.call_count == 2
-
-        # Verify signal handlers were set up
-        mock_setup_signals.assert_called_once()
-
-        # Verify server runs with default stdio mode
-        mock_server.run.assert_called_once_with()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--api_set", "biothings_all"])
-    def test_main_biothings_api_set(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function with biothings_all API set."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = "biothings_all"
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = None
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (2, 10, 5, 3)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main
-        main()
-
-        # Verify config was loaded
-        mock_load_config.assert_called_once()
-
-        # Verify server runs with stdio mode
-        mock_server.run.assert_called_once_with()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch(
-        "sys.argv",
-        [
-            "smartapi-mcp",
-            "--transport",
-            "http",
-            "--port",
-            "9001",
-            "--smartapi_id",
-            "test_id",
-        ],
+from smartapi_mcp import __version__
+
+# keep the CLI tests on one xdist worker under --dist loadgroup
+pytestmark = pytest.mark.xdist_group("cli")
+
+# argv shared by several scenarios; copied to a list when installed
+_ARGV_SMARTAPI_ID = ("smartapi-mcp", "--smartapi_id", "test_id")
+
+
+@pytest.fixture(autouse=True)
+def _stub_cli_collaborators(cli_patches):
+    """Run every CLI test against the stubbed collaborators and config."""
+    return cli_patches
+
+
+def test_argument_parser_default_values(cli_module):
+    """Test that argument parser sets correct default values."""
+    args = cli_module._PARSER.parse_args([])
+
+    assert args.api_set is None
+    assert args.transport is None
+    assert args.port == 8000
+
+
+def test_argument_parser_with_values(cli_module):
+    """Test argument parser with provided values."""
+    args = cli_module._PARSER.parse_args(
+        ["--api_set", "biothings_core", "--transport", "http", "--port", "9000"]
+    )
+
+    assert args.api_set == "biothings_core"
+    assert args.transport == "http"
+    assert args.port == 9000
+
+
+@pytest.mark.parametrize(
+    ("argv", "config_overrides", "counts", "expected_run_kwargs"),
+    [
+        pytest.param(
+            ("smartapi-mcp", "--api_set", "biothings_core"),
+            {"smartapi_api_set": "biothings_core"},
+            (0, 5, 3, 2),
+            {},
+            id="biothings_core_stdio",
+        ),
+        pytest.param(
+            ("smartapi-mcp", "--api_set", "biothings_all"),
+            {"smartapi_api_set": "biothings_all"},
+            (0, 5, 3, 2),
+            {},
+            id="biothings_all_stdio",
+        ),
+        pytest.param(
+            (
+                "smartapi-mcp",
+                "--transport",
+                "http",
+                "--port",
+                "9001",
+                "--smartapi_id",
+                "test_id",
+            ),
+            {"smartapi_id": "test_id", "transport": "http", "port": 9001},
+            (0, 5, 3, 2),
+            {"transport": "http", "host": "localhost", "port": 9001},
+            id="http",
+        ),
+        pytest.param(
+            _ARGV_SMARTAPI_ID,
+            {"smartapi_id": "test_id"},
+            (0, 5, 3, 2),
+            {},
+            id="stdio_default",
+        ),
+        pytest.param(
+            _ARGV_SMARTAPI_ID,
+            {"smartapi_id": "test_id"},
+            (1, 0, 0, 1),  # No tools or resources
+            {},
+            id="no_tools_or_resources",
+        ),
+        pytest.param(
+            ("smartapi-mcp", "--transport", "invalid", "--smartapi_id", "test_id"),
+            {"smartapi_id": "test_id", "transport": "invalid"},
+            (0, 5, 3, 2),
+            {},
+            id="invalid_transport_runs_stdio",
+        ),
+    ],
+)
+def test_main_scenarios(  # noqa: PLR0917
+    cli_module,
+    cli_patches,
+    mock_config,
+    monkeypatch,
+    argv,
+    config_overrides,
+    counts,
+    expected_run_kwargs,
+):
+    """Test main creates, counts and runs the server for each CLI scenario."""
+    monkeypatch.setattr(sys, "argv", list(argv))
+    for name, value in config_overrides.items():
+        setattr(mock_config, name, value)
+    mock_logger = MagicMock()
+    monkeypatch.setattr("awslabs.openapi_mcp_server.logger", mock_logger)
+
+    # Setup server mock, run through a real event loop
+    mock_server = Mock(spec=["run"])
+    cli_patches.get_merged_mcp_server.return_value = mock_server
+    cli_patches.get_all_counts.return_value = counts
+
+    cli_module.main()
+
+    cli_patches.load_config.assert_called_once()
+    # Server creation and counting share a single asyncio.run call
+    cli_patches.asyncio.run.assert_called_once()
+    assert (
+        cli_patches.get_merged_mcp_server.await_args.kwargs["api_set"]
+        == mock_config.smartapi_api_set
+    )
+    cli_patches.get_all_counts.assert_awaited_once_with(mock_server)
+    cli_patches.setup_signal_handlers.assert_called_once()
+
+    # Only a server without tools or resources is warned about
+    _, tools, resources, _ = counts
+    warnings = [c.args[0] for c in mock_logger.warning.call_args_list]
+    assert any("No tools or resources" in w for w in warnings) == (
+        tools == 0 and resources == 0
+    )
+
+    mock_server.run.assert_called_once_with(**expected_run_kwargs)
+
+
+def test_argument_parsing_integration(
+    cli_module, cli_patches, mock_config, monkeypatch
+):
+    """Test that argument parsing works correctly with all options."""
+    # Mock different argument combinations
+    mock_args = SimpleNamespace(
+        api_set="biothings_core",
+        transport="http",
+        port=8080,
+        host="localhost",
+        log_level="INFO",
+    )
+    mock_parse_args = MagicMock(return_value=mock_args)
+    monkeypatch.setattr(cli_module._PARSER, "parse_args", mock_parse_args)
+
+    mock_config.smartapi_api_set = "biothings_core"
+    mock_config.transport = "http"
+    mock_config.host = "localhost"
+    mock_config.port = 8080
+
+    mock_server = Mock(spec=["run"])
+
+    # asyncio.run creates the server and counts its components in one go
+    cli_patches.asyncio.run.return_value = mock_server
+
+    cli_module.main()
+
+    # Verify the parsed arguments were used
+    assert mock_parse_args.called
+    mock_server.run.assert_called_once_with(
+        transport="http", host="localhost", port=8080
+    )
+
+
+def test_cli_import_defers_heavy_dependencies():
+    """Test that importing the CLI loads neither awslabs nor the config module."""
+    code = (
+        "import sys, smartapi_mcp.cli; "
+        "print(sorted(m for m in sys.modules "
+        "if m.startswith(('awslabs', 'smartapi_mcp.config'))))"
     )
-    def test_main_http_mode(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function with HTTP mode."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = "test_id"
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "http"
-        mock_config.host = "localhost"
-        mock_config.port = 9001
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (1, 3, 2, 1)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main
-        main()
-
-        # Verify server runs with HTTP transport
-        mock_server.run.assert_called_once_with(
-            transport="http", host="localhost", port=9001
-        )
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--smartapi_id", "test_id"])
-    def test_main_stdio_mode_default(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function with default stdio mode."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = "test_id"
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (1, 3, 2, 1)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main
-        main()
-
-        # Verify server runs with stdio mode
-        mock_server.run.assert_called_once_with()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--smartapi_id", "test_id"])
-    def test_main_no_tools_or_resources_warning(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function warns when no tools or resources are available."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = "test_id"
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (1, 0, 0, 1)  # No tools or resources
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main - this should log a warning but not fail
-        main()
-
-        # This test now just verifies the main function completes without error
-        # The warning logging would need to be checked by capturing the logger output
-        mock_server.run.assert_called_once_with()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--smartapi_id", "test_id"])
-    def test_main_counts_exception_handling(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function handles exceptions during count retrieval."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = "test_id"
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls - server creation succeeds, count retrieval fails
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                error_msg = "Count error"
-                raise Exception(error_msg)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main and expect sys.exit(1)
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-
-        assert exc_info.value.code == 1
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--api_set", "unknown"])
-    def test_main_unknown_api_set_raises_error(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function raises error for unknown API set."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = "unknown"
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = None
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Mock asyncio.run to raise ValueError for unknown API set
-        def mock_run_side_effect(_coro):
-            # First call is get_merged_mcp_server - should fail
-            error_msg = "Unknown API set: unknown"
-            raise ValueError(error_msg)
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main and expect it to raise ValueError
-        with pytest.raises(ValueError, match="Unknown API set: unknown"):
-            main()
-
-    @patch("smartapi_mcp.cli.argparse.ArgumentParser.parse_args")
-    def test_argument_parsing_integration(self, mock_parse_args):
-        """Test that argument parsing works correctly with all options."""
-        # Mock different argument combinations
-        mock_args = MagicMock()
-        mock_args.api_set = "biothings_core"
-        mock_args.transport = "http"
-        mock_args.port = 8080
-        mock_args.host = "localhost"
-        mock_args.log_level = "INFO"  # Add this to avoid the MagicMock issue
-        mock_parse_args.return_value = mock_args
-
-        with (
-            patch("smartapi_mcp.cli.asyncio") as mock_asyncio,
-            patch("smartapi_mcp.cli.get_merged_mcp_server"),
-            patch("smartapi_mcp.cli.get_all_counts"),
-            patch("smartapi_mcp.cli.setup_signal_handlers"),
-            patch("smartapi_mcp.cli.load_config") as mock_load_config,
-        ):
-            # Setup config mock
-            mock_config = MagicMock()
-            mock_config.smartapi_api_set = "biothings_core"
-            mock_config.smartapi_q = None
-            mock_config.smartapi_id = None
-            mock_config.smartapi_ids = None
-            mock_config.smartapi_exclude_ids = None
-            mock_config.server_name = "smartapi_mcp"
-            mock_config.transport = "http"
-            mock_config.host = "localhost"
-            mock_config.port = 8080
-            mock_load_config.return_value = mock_config
-
-            mock_server = MagicMock()
-
-            # Use a counter to track which asyncio.run call we're on
-            call_count = [0]
-
-            # Mock asyncio.run calls
-            def mock_run_side_effect(_coro):
-                call_count[0] += 1
-                if call_count[0] == 1:
-                    # First call is get_merged_mcp_server
-                    return mock_server
-                if call_count[0] == 2:
-                    # Second call is get_all_counts
-                    return (1, 3, 2, 1)
-                return None
-
-            mock_asyncio.run.side_effect = mock_run_side_effect
-
-            main()
-
-            # Verify the parsed arguments were used
-            assert mock_parse_args.called
-            mock_server.run.assert_called_once_with(
-                transport="http", host="localhost", port=8080
-            )
-
-
-class TestCLIEdgeCases:
-    """Test edge cases and error conditions."""
-
-    @patch("sys.argv", ["smartapi-mcp", "--port", "invalid"])
-    def test_invalid_port_argument(self):
-        """Test that invalid port argument is handled by argparse."""
-        with pytest.raises(SystemExit):
-            main()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch("sys.argv", ["smartapi-mcp", "--api_set", ""])
-    def test_empty_api_set(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test main function with empty API set string."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = None
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "stdio"
-        mock_load_config.return_value = mock_config
-
-        # Mock asyncio.run calls - should fail due to no smartapi_ids
-        def mock_run_side_effect(_coro):
-            # First call is get_merged_mcp_server - should fail
-            error_msg = "No SmartAPI IDs provided or found with the given query."
-            raise ValueError(error_msg)
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main and expect it to raise ValueError
-        with pytest.raises(ValueError, match="No SmartAPI IDs provided"):
-            main()
-
-    @patch("smartapi_mcp.cli.asyncio")
-    @patch("smartapi_mcp.cli.get_merged_mcp_server")
-    @patch("smartapi_mcp.cli.get_all_counts")
-    @patch("smartapi_mcp.cli.load_config")
-    @patch(
-        "sys.argv",
-        ["smartapi-mcp", "--transport", "invalid", "--smartapi_id", "test_id"],
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
     )
-    def test_invalid_mode_still_runs_stdio(
-        self,
-        mock_load_config,
-        mock_get_all_counts,
-        mock_get_merged_mcp_server,
-        mock_asyncio,
-    ):
-        """Test that invalid transport mode defaults to stdio."""
-        # Setup config mock
-        mock_config = MagicMock()
-        mock_config.smartapi_api_set = ""
-        mock_config.smartapi_q = None
-        mock_config.smartapi_id = "test_id"
-        mock_config.smartapi_ids = None
-        mock_config.smartapi_exclude_ids = None
-        mock_config.server_name = "smartapi_mcp"
-        mock_config.transport = "invalid"  # Invalid transport mode
-        mock_load_config.return_value = mock_config
-
-        # Setup server mock
-        mock_server = MagicMock()
-
-        # Use a counter to track which asyncio.run call we're on
-        call_count = [0]
-
-        # Mock asyncio.run calls
-        def mock_run_side_effect(_coro):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                # First call is get_merged_mcp_server
-                return mock_server
-            if call_count[0] == 2:
-                # Second call is get_all_counts
-                return (1, 3, 2, 1)
-            return None
-
-        mock_asyncio.run.side_effect = mock_run_side_effect
-
-        # Run main - should use stdio mode as default for invalid transport
-        main()
-
-        # Should default to stdio mode
-        mock_server.run.assert_called_once_with()
+    assert result.stdout.strip() == "[]"
+
+
+def test_version_argument(cli_module, capsys, monkeypatch):
+    """Test that --version prints the package version and exits."""
+    monkeypatch.setattr(sys, "argv", ["smartapi-mcp", "--version"])
+    with pytest.raises(SystemExit) as exc_info:
+        cli_module.main()
+
+    assert exc_info.value.code == 0
+    assert __version__ in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    ("argv", "failing", "error", "expected_exc", "match"),
+    [
+        pytest.param(
+            _ARGV_SMARTAPI_ID,
+            "get_all_counts",
+            RuntimeError("Count error"),
+            SystemExit,
+            "^1$",
+            id="counts_error_exits",
+        ),
+        pytest.param(
+            ("smartapi-mcp", "--api_set", "unknown"),
+            "get_merged_mcp_server",
+            ValueError("Unknown API set: unknown"),
+            ValueError,
+            "Unknown API set: unknown",
+            id="unknown_api_set",
+        ),
+        pytest.param(
+            ("smartapi-mcp", "--api_set", ""),
+            "get_merged_mcp_server",
+            ValueError("No SmartAPI IDs provided or found with the given query."),
+            ValueError,
+            "No SmartAPI IDs provided",
+            id="empty_api_set",
+        ),
+        pytest.param(
+            ("smartapi-mcp", "--port", "invalid"),
+            None,
+            None,
+            SystemExit,
+            "^2$",
+            id="invalid_port",
+        ),
+    ],
+)
+def test_main_error_paths(  # noqa: PLR0917
+    cli_module,
+    cli_patches,
+    monkeypatch,
+    argv,
+    failing,
+    error,
+    expected_exc,
+    match,
+):
+    """Test main fails without running the server on startup errors."""
+    monkeypatch.setattr(sys, "argv", list(argv))
+    mock_server = Mock(spec=["run"])
+    cli_patches.get_merged_mcp_server.return_value = mock_server
+    if failing:
+        getattr(cli_patches, failing).side_effect = error
+
+    with pytest.raises(expected_exc, match=match):
+        cli_module.main()
+
+    mock_server.run.assert_not_called()
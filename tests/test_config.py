@@ -12,13 +12,29 @@ testing all aspects of configuration loading including:
 - Configuration validation
 """
 
-import os
 from types import SimpleNamespace
-from unittest.mock import MagicMock, patch
+from unittest.mock import Mock
 
+import pytest
 from awslabs.openapi_mcp_server.api.config import Config as BaseConfig
 
-from smartapi_mcp.config import Config, load_config
+from smartapi_mcp.config import (
+    _ENV_KEYS,
+    Config,
+    clear_cache,
+    load_config,
+    reload_env,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_env_snapshot():
+    """Make each test read the environment as patched by that test."""
+    reload_env()
+    clear_cache()
+    yield
+    reload_env()
+    clear_cache()
 
 
 class TestConfig:
@@ -62,18 +78,31 @@ class TestConfig:
 class TestLoadConfig:
     """Test cases for load_config function."""
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_no_args_no_env(self, mock_base_load_config, mock_logger):
-        """Test load_config with no arguments and no environment variables."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_config.__class__.__name__ = "Config"
-        mock_base_load_config.return_value = mock_base_config
+    @pytest.fixture(autouse=True)
+    def mocks(self, monkeypatch):
+        """Stub the logger, the base load_config and dataclass fields.
+
+        Also unsets the SmartAPI environment variables, so each test only
+        sees the ones it sets itself.
+        """
+        for key in _ENV_KEYS:
+            monkeypatch.delenv(key, raising=False)
+        mocks = SimpleNamespace(
+            logger=Mock(),
+            base_load=Mock(return_value=Mock(spec=BaseConfig)),
+            fields=Mock(return_value=[]),
+        )
+        monkeypatch.setattr("smartapi_mcp.config.logger", mocks.logger)
+        monkeypatch.setattr(
+            "awslabs.openapi_mcp_server.api.config.load_config", mocks.base_load
+        )
+        monkeypatch.setattr("smartapi_mcp.config.fields", mocks.fields)
+        return mocks
 
-        # Mock dataclass fields (empty for simplicity)
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config()
+    def test_load_config_no_args_no_env(self, mocks):
+        """Test load_config with no arguments and no environment variables."""
+        # Base config and its dataclass fields are stubbed (empty) by mocks
+        config = load_config()
 
         # Test default values
         assert isinstance(config, Config)
@@ -85,21 +114,13 @@ class TestLoadConfig:
         assert config.server_name == "smartapi-mcp"
 
         # Test that base load_config was called
-        mock_base_load_config.assert_called_once_with(None)
+        mocks.base_load.assert_called_once_with(None)
 
         # Test that final log message was called
-        mock_logger.info.assert_called_once_with("SmartAPI Configuration loaded")
+        mocks.logger.info.assert_called_once_with("SmartAPI Configuration loaded")
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_environment_variables(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_with_environment_variables(self, mocks, monkeypatch):
         """Test load_config with environment variables set."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
         env_vars = {
             "SMARTAPI_ID": "env_test_id",
             "SMARTAPI_IDS": "id1,id2",
@@ -109,11 +130,9 @@ class TestLoadConfig:
             "SERVER_NAME": "env_server",
         }
 
-        with (
-            patch("smartapi_mcp.config.fields", return_value=[]),
-            patch.dict(os.environ, env_vars, clear=False),
-        ):
-            config = load_config()
+        for key, value in env_vars.items():
+            monkeypatch.setenv(key, value)
+        config = load_config()
 
         # Test that environment variables were loaded
         assert config.smartapi_id == "env_test_id"
@@ -125,31 +144,21 @@ class TestLoadConfig:
         assert config.server_name == "env_server"
 
         # Test that debug message was logged
-        mock_logger.debug.assert_called_once()
-        debug_call = mock_logger.debug.call_args[0][0]
+        mocks.logger.debug.assert_called_once()
+        debug_call = mocks.logger.debug.call_args[0][0]
         assert "Loaded 6 SmartAPI-specific environment variables" in debug_call
         assert (
             "SMARTAPI_ID, SMARTAPI_IDS, SMARTAPI_EXCLUDE_IDS, SMARTAPI_Q, "
             "SMARTAPI_API_SET, SERVER_NAME" in debug_call
         )
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_partial_environment_variables(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_with_partial_environment_variables(self, monkeypatch):
         """Test load_config with only some environment variables set."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
         env_vars = {"SMARTAPI_ID": "partial_env_id", "SMARTAPI_Q": "partial env query"}
 
-        with (
-            patch("smartapi_mcp.config.fields", return_value=[]),
-            patch.dict(os.environ, env_vars, clear=False),
-        ):
-            config = load_config()
+        for key, value in env_vars.items():
+            monkeypatch.setenv(key, value)
+        config = load_config()
 
         # Test that only set environment variables were loaded
         assert config.smartapi_id == "partial_env_id"
@@ -160,168 +169,79 @@ class TestLoadConfig:
         assert config.smartapi_api_set == ""
         assert config.server_name == "smartapi-mcp"
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_smartapi_id(
-        self, mock_base_load_config, mock_logger
-    ):
-        """Test load_config with smartapi_id argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args
-        args = SimpleNamespace()
-        args.smartapi_id = "args_test_id"
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.smartapi_id == "args_test_id"
-        mock_logger.debug.assert_called_with(
-            "Setting SmartAPI id from arguments: args_test_id"
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_smartapi_ids(
-        self, mock_base_load_config, mock_logger
-    ):
-        """Test load_config with smartapi_ids argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args with both smartapi_id and smartapi_ids
-        # Note: The code has a bug where it checks args.smartapi_id
-        # instead of args.smartapi_ids
-        args = SimpleNamespace()
-        args.smartapi_id = "trigger_id"  # This needs to be set for the bug
-        args.smartapi_ids = ["args_id1", "args_id2"]
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.smartapi_ids == ["args_id1", "args_id2"]
-        mock_logger.debug.assert_called_with(
-            f"Setting SmartAPI ids from arguments: {['args_id1', 'args_id2']}"
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_smartapi_exclude_ids(
-        self, mock_base_load_config, mock_logger
-    ):
-        """Test load_config with smartapi_exclude_ids argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args with smartapi_id (needed for the condition to trigger)
-        args = SimpleNamespace()
-        args.smartapi_id = "trigger_id"  # This needs to be set for the bug
-        args.smartapi_exclude_ids = ["exclude_id1", "exclude_id2"]
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.smartapi_exclude_ids == ["exclude_id1", "exclude_id2"]
-        # Note: The logger call has a bug with formatting
-        mock_logger.debug.assert_called_with(
-            "Setting excluded SmartAPI ids from arguments: {}",
-            ["exclude_id1", "exclude_id2"],
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_smartapi_q(self, mock_base_load_config, mock_logger):
-        """Test load_config with smartapi_q argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args
-        args = SimpleNamespace()
-        args.smartapi_q = "args query test"
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.smartapi_q == "args query test"
-        mock_logger.debug.assert_called_with(
-            "Setting SmartAPI query from arguments: args query test"
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_api_set(self, mock_base_load_config, mock_logger):
-        """Test load_config with api_set argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args
-        args = SimpleNamespace()
-        args.api_set = "biothings_all"
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.smartapi_api_set == "biothings_all"
-        mock_logger.debug.assert_called_with(
-            "Setting predefined SmartAPI API set from arguments: {}", "biothings_all"
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_server_name(
-        self, mock_base_load_config, mock_logger
+    @pytest.mark.parametrize(
+        ("attr", "value", "config_attr", "debug_args"),
+        [
+            pytest.param(
+                "smartapi_id",
+                "args_test_id",
+                "smartapi_id",
+                ("Setting SmartAPI id from arguments: args_test_id",),
+                id="smartapi_id",
+            ),
+            pytest.param(
+                "smartapi_ids",
+                ["args_id1", "args_id2"],
+                "smartapi_ids",
+                (f"Setting SmartAPI ids from arguments: {['args_id1', 'args_id2']}",),
+                id="smartapi_ids",
+            ),
+            pytest.param(
+                "smartapi_exclude_ids",
+                ["exclude_id1", "exclude_id2"],
+                "smartapi_exclude_ids",
+                (
+                    "Setting excluded SmartAPI ids from arguments: {}",
+                    ["exclude_id1", "exclude_id2"],
+                ),
+                id="smartapi_exclude_ids",
+            ),
+            pytest.param(
+                "smartapi_q",
+                "args query test",
+                "smartapi_q",
+                ("Setting SmartAPI query from arguments: args query test",),
+                id="smartapi_q",
+            ),
+            pytest.param(
+                "api_set",
+                "biothings_all",
+                "smartapi_api_set",
+                (
+                    "Setting predefined SmartAPI API set from arguments: {}",
+                    "biothings_all",
+                ),
+                id="api_set",
+            ),
+            pytest.param(
+                "server_name",
+                "custom_args_server",
+                "server_name",
+                ("Setting MCP Server name from arguments: custom_args_server",),
+                id="server_name",
+            ),
+            pytest.param(
+                "transport",
+                "http",
+                "transport",
+                ("Setting MCP Server transport mode from arguments: http",),
+                id="transport",
+            ),
+        ],
+    )
+    def test_load_config_arg_sets_field(
+        self, mocks, attr, value, config_attr, debug_args
     ):
-        """Test load_config with server_name argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Create mock args
-        args = SimpleNamespace()
-        args.server_name = "custom_args_server"
-
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.server_name == "custom_args_server"
-        mock_logger.debug.assert_called_with(
-            "Setting MCP Server name from arguments: custom_args_server"
-        )
-
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_args_transport(self, mock_base_load_config, mock_logger):
-        """Test load_config with transport argument."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
+        """Test each load_config argument sets its config field and logs it."""
+        args = SimpleNamespace(**{attr: value})
 
-        # Create mock args
-        args = SimpleNamespace()
-        args.transport = "http"
+        config = load_config(args)
 
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
-
-        assert config.transport == "http"
-        mock_logger.debug.assert_called_with(
-            "Setting MCP Server transport mode from arguments: http"
-        )
+        assert getattr(config, config_attr) == value
+        mocks.logger.debug.assert_called_once_with(*debug_args)
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_args_override_env(self, mock_base_load_config, mock_logger):
+    def test_load_config_args_override_env(self, monkeypatch):
         """Test that arguments override environment variables."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
         # Set environment variables
         env_vars = {
             "SMARTAPI_ID": "env_id",
@@ -330,40 +250,31 @@ class TestLoadConfig:
         }
 
         # Create args that should override env
-        args = SimpleNamespace()
-        args.smartapi_id = "args_id"
-        args.smartapi_q = "args query"
-        args.server_name = "args_server"
+        args = SimpleNamespace(
+            smartapi_id="args_id",
+            smartapi_q="args query",
+            server_name="args_server",
+        )
 
-        with (
-            patch("smartapi_mcp.config.fields", return_value=[]),
-            patch.dict(os.environ, env_vars, clear=False),
-        ):
-            config = load_config(args)
+        for key, value in env_vars.items():
+            monkeypatch.setenv(key, value)
+        config = load_config(args)
 
         # Args should override env vars
         assert config.smartapi_id == "args_id"
         assert config.smartapi_q == "args query"
         assert config.server_name == "args_server"
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_args_with_empty_values(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_args_with_empty_values(self, mocks):
         """Test load_config with args that have empty/None values."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
         # Create args with empty/None values
-        args = SimpleNamespace()
-        args.smartapi_id = ""  # Empty string should not trigger setting
-        args.smartapi_q = None  # None should not trigger setting
-        args.api_set = ""  # Empty string should not trigger setting
+        args = SimpleNamespace(
+            smartapi_id="",  # Empty string should not trigger setting
+            smartapi_q=None,  # None should not trigger setting
+            api_set="",  # Empty string should not trigger setting
+        )
 
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
+        config = load_config(args)
 
         # Should remain defaults since args were empty/None
         assert config.smartapi_id == ""
@@ -371,76 +282,42 @@ class TestLoadConfig:
         assert config.smartapi_api_set == ""
 
         # Logger should not be called for debug messages since conditions weren't met
-        mock_logger.debug.assert_not_called()
+        mocks.logger.debug.assert_not_called()
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_args_without_attributes(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_args_without_attributes(self):
         """Test load_config with args object that doesn't have certain attributes."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
         # Create args without certain attributes
-        args = SimpleNamespace()
-        args.smartapi_id = "test_id"
+        args = SimpleNamespace(smartapi_id="test_id")
         # Deliberately not setting other attributes
 
-        with patch("smartapi_mcp.config.fields", return_value=[]):
-            config = load_config(args)
+        config = load_config(args)
 
         # Only the set attribute should be configured
         assert config.smartapi_id == "test_id"
         assert config.smartapi_q == ""  # Default
         assert config.smartapi_api_set == ""  # Default
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_with_base_config_fields(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_with_base_config_fields(self, mocks):
         """Test load_config properly copies fields from base config."""
-        # Mock the base config with some fields
-        mock_base_config = MagicMock()
-        mock_base_config.some_field = "some_value"
-        mock_base_config.another_field = 42
-        mock_base_load_config.return_value = mock_base_config
-
-        # Mock dataclass fields
-        mock_field1 = MagicMock()
-        mock_field1.name = "some_field"
-        mock_field2 = MagicMock()
-        mock_field2.name = "another_field"
-
-        with patch(
-            "smartapi_mcp.config.fields", return_value=[mock_field1, mock_field2]
-        ):
-            config = load_config()
+        # Base config with fields the real dataclass does not have
+        mocks.base_load.return_value = SimpleNamespace(
+            some_field="some_value", another_field=42
+        )
+        mocks.fields.return_value = [
+            SimpleNamespace(name="some_field"),
+            SimpleNamespace(name="another_field"),
+        ]
+
+        config = load_config()
 
         # Test that fields were copied from base config
         assert config.some_field == "some_value"
         assert config.another_field == 42
 
-    @patch("smartapi_mcp.config.logger")
-    @patch("awslabs.openapi_mcp_server.api.config.load_config")
-    def test_load_config_no_env_variables_loaded(
-        self, mock_base_load_config, mock_logger
-    ):
+    def test_load_config_no_env_variables_loaded(self, mocks):
         """Test load_config when no environment variables are present."""
-        # Mock the base config
-        mock_base_config = MagicMock()
-        mock_base_load_config.return_value = mock_base_config
-
-        # Ensure no SmartAPI env vars are set
-
-        with (
-            patch("smartapi_mcp.config.fields", return_value=[]),
-            # Clear the environment of SmartAPI-related variables
-            patch.dict(os.environ, {}, clear=True),
-        ):
-            config = load_config()
+        # The mocks fixture unsets every SmartAPI-related variable
+        config = load_config()
 
         # Should have default values
         assert config.smartapi_id == ""
@@ -449,7 +326,82 @@ class TestLoadConfig:
         # Debug message about env vars should NOT be called
         debug_calls = [
             call
-            for call in mock_logger.debug.call_args_list
+            for call in mocks.logger.debug.call_args_list
             if call[0][0].startswith("Loaded")
         ]
         assert len(debug_calls) == 0  # No debug message about loaded env vars
+
+    def test_load_config_memo_reset_by_reload_env(self, mocks, monkeypatch):
+        """Test reload_env() also drops configs memoized under the old environment."""
+        load_config()
+        monkeypatch.setenv("SERVER_PORT", "9001")
+        load_config()
+        mocks.base_load.assert_called_once()
+
+        reload_env()
+        load_config()
+        assert mocks.base_load.call_count == 2
+
+    def test_load_config_memo_is_bounded(self, mocks, monkeypatch):
+        """Test the least recently used config is dropped once the memo is full."""
+        monkeypatch.setattr("smartapi_mcp.config.CONFIG_CACHE_SIZE", 2)
+        load_config(SimpleNamespace(smartapi_id="id1"))
+        load_config(SimpleNamespace(smartapi_id="id2"))
+        load_config(SimpleNamespace(smartapi_id="id1"))
+        load_config(SimpleNamespace(smartapi_id="id3"))
+        assert mocks.base_load.call_count == 3
+
+        # id1 was used more recently than id2, so only id2 was evicted
+        load_config(SimpleNamespace(smartapi_id="id1"))
+        assert mocks.base_load.call_count == 3
+        load_config(SimpleNamespace(smartapi_id="id2"))
+        assert mocks.base_load.call_count == 4
+
+    def test_load_config_reuses_env_snapshot(self, monkeypatch):
+        """Test the environment is read once until reload_env() is called."""
+        monkeypatch.setenv("SMARTAPI_ID", "first_id")
+        assert load_config().smartapi_id == "first_id"
+
+        monkeypatch.setenv("SMARTAPI_ID", "second_id")
+        assert load_config().smartapi_id == "first_id"
+        reload_env()
+        assert load_config().smartapi_id == "second_id"
+
+    def test_load_config_ignores_unknown_env_variables(self, mocks, monkeypatch):
+        """Test only the known SmartAPI environment variables are loaded."""
+        env_vars = {"SMARTAPI_UNKNOWN": "ignored", "SMARTAPI_ROUTING": "true"}
+
+        for key, value in env_vars.items():
+            monkeypatch.setenv(key, value)
+        config = load_config()
+
+        assert config.smart_routing is True
+        mocks.logger.debug.assert_called_once_with(
+            "Loaded 1 SmartAPI-specific environment variables: SMARTAPI_ROUTING"
+        )
+
+    def test_load_config_memoizes_identical_calls(self, mocks):
+        """Test repeated calls with equal args reuse the loaded config."""
+        first = load_config(SimpleNamespace(smartapi_ids=["id1", "id2"]))
+        first.smart_routing = True
+        second = load_config(SimpleNamespace(smartapi_ids=["id1", "id2"]))
+
+        # Loaded once, but each caller gets its own copy
+        mocks.base_load.assert_called_once()
+        assert second is not first
+        assert second.smartapi_ids == ["id1", "id2"]
+        assert second.smart_routing is False
+
+        # list fields are not shared with the cache or other callers
+        first.smartapi_ids.append("id3")
+        assert second.smartapi_ids == ["id1", "id2"]
+        third = load_config(SimpleNamespace(smartapi_ids=["id1", "id2"]))
+        assert third.smartapi_ids == ["id1", "id2"]
+        mocks.base_load.assert_called_once()
+
+        load_config(SimpleNamespace(smartapi_ids=["id3"]))
+        assert mocks.base_load.call_count == 2
+
+        clear_cache()
+        load_config(SimpleNamespace(smartapi_ids=["id1", "id2"]))
+        assert mocks.base_load.call_count == 3
@@ -0,0 +1,52 @@
+"""
+Tests for smartapi_mcp.__main__ module
+
+Tests the `python -m smartapi_mcp` entry point.
+"""
+
+import inspect
+import runpy
+from unittest.mock import patch
+
+import pytest
+
+from smartapi_mcp.cli import main
+
+
+@pytest.fixture(scope="module")
+def main_module():
+    """Import smartapi_mcp.__main__ once for the whole module."""
+    import smartapi_mcp.__main__ as module  # noqa: PLC0415
+
+    return module
+
+
+def test_import_does_not_run_main(main_module):
+    """Test that importing __main__ exposes the CLI entry point without running."""
+    assert main_module.main is main
+
+
+def test_main_guard_present(main_module):
+    """Test that main() only runs behind the __name__ == "__main__" guard."""
+    assert 'if __name__ == "__main__":' in inspect.getsource(main_module)
+
+
+# runpy warns because main_module already imported smartapi_mcp.__main__
+@pytest.mark.filterwarnings("ignore:.*found in sys.modules:RuntimeWarning")
+@patch("smartapi_mcp.cli.main")
+def test_run_as_module_calls_main(mock_main):
+    """Test that `python -m smartapi_mcp` runs the CLI main()."""
+    runpy.run_module("smartapi_mcp", run_name="__main__", alter_sys=False)
+
+    mock_main.assert_called_once_with()
+
+
+@pytest.mark.filterwarnings("ignore:.*found in sys.modules:RuntimeWarning")
+@pytest.mark.parametrize("error", [RuntimeError("boom"), KeyboardInterrupt()])
+def test_run_as_module_propagates_exceptions(error):
+    """Test that errors raised by main() propagate out of the entry point."""
+    with (
+        patch("smartapi_mcp.cli.main", side_effect=error),
+        pytest.raises(type(error)),
+    ):
+        runpy.run_module("smartapi_mcp", run_name="__main__", alter_sys=False)
@@ -0,0 +1,484 @@
+"""
+Tests for smartapi_mcp.router module
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from smartapi_mcp import router
+from smartapi_mcp.router import (
+    QueryBatcher,
+    _build_index,
+    _category_routing,
+    _ensure_semantic_index,
+    _get_descriptions,
+    _load_model,
+    _load_tools_into,
+    _set_nprobe,
+    smart_search_smartapi,
+)
+
+faiss = pytest.importorskip("faiss")
+np = pytest.importorskip("numpy")
+
+DIM = 4
+
+
+def _make_index():
+    """A flat inner-product index over the DIM unit vectors."""
+    index = faiss.IndexFlatIP(DIM)
+    index.add(np.eye(DIM, dtype=np.float32))
+    return index
+
+
+def _make_model():
+    """A stand-in model: maps each query text to a unit vector."""
+    return {text: np.eye(DIM, dtype=np.float32)[i] for i, text in enumerate("abcd")}
+
+
+@pytest.fixture
+def encode_calls(monkeypatch):
+    """Replace _encode with a lookup in the stand-in model, recording calls."""
+    calls = []
+
+    def fake_encode(model, texts):
+        calls.append(list(texts))
+        return np.stack([model[text] for text in texts])
+
+    monkeypatch.setattr(router, "_encode", fake_encode)
+    return calls
+
+
+async def test_query_batcher_slices_results_to_each_limit(encode_calls):
+    """Test each caller gets its own row, truncated to the limit it asked for."""
+    batcher = QueryBatcher(max_batch_size=32, max_wait=0.01)
+    index, model = _make_index(), _make_model()
+
+    (d1, i1), (_, i3) = await asyncio.gather(
+        batcher.submit(index, model, "a", 1),
+        batcher.submit(index, model, "b", 3),
+    )
+
+    assert encode_calls == [["a", "b"]]
+    assert i1.tolist() == [0]
+    assert d1.tolist() == pytest.approx([1.0])
+    assert len(i3) == 3
+    assert i3[0] == 1
+
+
+async def test_query_batcher_groups_by_index_and_model(encode_calls):
+    """Test queries only share a search when they target the same index/model."""
+    batcher = QueryBatcher(max_batch_size=32, max_wait=0.01)
+    index, model = _make_index(), _make_model()
+    other_index, other_model = _make_index(), _make_model()
+
+    results = await asyncio.gather(
+        batcher.submit(index, model, "a", 1),
+        batcher.submit(other_index, model, "b", 1),
+        batcher.submit(index, other_model, "c", 1),
+        batcher.submit(index, model, "d", 1),
+    )
+
+    assert sorted(encode_calls) == [["a", "d"], ["b"], ["c"]]
+    assert [indices.tolist() for _, indices in results] == [[0], [1], [2], [3]]
+
+
+async def test_query_batcher_flushes_on_batch_size(encode_calls):
+    """Test a full batch is searched at once, without waiting for the timer."""
+    batcher = QueryBatcher(max_batch_size=2, max_wait=60)
+    index, model = _make_index(), _make_model()
+
+    await asyncio.wait_for(
+        asyncio.gather(
+            batcher.submit(index, model, "a", 1),
+            batcher.submit(index, model, "b", 1),
+        ),
+        timeout=5,
+    )
+
+    assert encode_calls == [["a", "b"]]
+
+
+async def test_query_batcher_flushes_on_timer(encode_calls):
+    """Test a partial batch is searched once max_wait has passed."""
+    batcher = QueryBatcher(max_batch_size=32, max_wait=0.01)
+    index, model = _make_index(), _make_model()
+
+    _, indices = await asyncio.wait_for(batcher.submit(index, model, "c", 1), timeout=5)
+
+    assert indices.tolist() == [2]
+    assert encode_calls == [["c"]]
+
+
+async def test_query_batcher_propagates_errors_to_group(monkeypatch):
+    """Test a failed search raises in every query of its group."""
+
+    def failing_encode(*_):
+        err_msg = "encode failed"
+        raise RuntimeError(err_msg)
+
+    monkeypatch.setattr(router, "_encode", failing_encode)
+    batcher = QueryBatcher(max_batch_size=32, max_wait=0.01)
+    index, model = _make_index(), _make_model()
+
+    results = await asyncio.gather(
+        batcher.submit(index, model, "a", 1),
+        batcher.submit(index, model, "b", 1),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert all(str(result) == "encode failed" for result in results)
+
+
+def test_query_batcher_recovers_on_new_event_loop(encode_calls):
+    """Test a timer left pending by a closed loop does not block the next loop."""
+    batcher = QueryBatcher(max_batch_size=32, max_wait=0.05)
+    index, model = _make_index(), _make_model()
+
+    async def submit(query, timeout):
+        return await asyncio.wait_for(
+            batcher.submit(index, model, query, 1), timeout=timeout
+        )
+
+    # cancelled while its flush timer is still pending, then the loop closes
+    with pytest.raises(TimeoutError):
+        asyncio.run(submit("a", 0.001))
+
+    _, indices = asyncio.run(submit("b", 5))
+
+    assert indices.tolist() == [1]
+    assert encode_calls == [["b"]]
+
+
+async def test_load_tools_into_skips_failing_servers(monkeypatch, make_mock_server):
+    """Test tools of the loaded APIs are registered and failing APIs skipped."""
+    tools = {
+        "api_1": {"a": Mock(), "b": Mock()},
+        "api_3": {"c": Mock()},
+    }
+
+    async def fake_get_mcp_server(smartapi_id):
+        if smartapi_id not in tools:
+            err_msg = f"cannot load {smartapi_id}"
+            raise ValueError(err_msg)
+        return make_mock_server(smartapi_id, tools=tools[smartapi_id])
+
+    async def fake_merge_mcp_servers(servers, merged_name):
+        (server,) = servers
+        return make_mock_server(merged_name, tools=await server.get_tools())
+
+    monkeypatch.setattr("smartapi_mcp.server.get_mcp_server", fake_get_mcp_server)
+    monkeypatch.setattr("smartapi_mcp.server.merge_mcp_servers", fake_merge_mcp_servers)
+    mock_logger = Mock()
+    monkeypatch.setattr(router, "logger", mock_logger)
+    target = Mock(spec=["add_tool"])
+
+    loaded, registered = await _load_tools_into(
+        target, ["api_1", "api_2", "api_3"], "batch"
+    )
+
+    assert (loaded, registered) == (2, 3)
+    added = [call.args[0] for call in target.add_tool.call_args_list]
+    expected = [*tools["api_1"].values(), *tools["api_3"].values()]
+    assert sorted(map(id, added)) == sorted(map(id, expected))
+    mock_logger.warning.assert_called_once_with(
+        "Failed to load SmartAPI api_2: cannot load api_2"
+    )
+
+
+async def test_load_tools_into_nothing_loaded(monkeypatch):
+    """Test no tools are registered when every API fails to load."""
+
+    async def failing_get_mcp_server(smartapi_id):
+        err_msg = f"cannot load {smartapi_id}"
+        raise ValueError(err_msg)
+
+    monkeypatch.setattr("smartapi_mcp.server.get_mcp_server", failing_get_mcp_server)
+    monkeypatch.setattr(router, "logger", Mock())
+    target = Mock(spec=["add_tool"])
+
+    assert await _load_tools_into(target, ["api_1", "api_2"], "batch") == (0, 0)
+    target.add_tool.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("n_vectors", "index_type", "nlist"),
+    [
+        pytest.param(63, "IndexFlatIP", None, id="flat_below_ivf_threshold"),
+        pytest.param(64, "IndexIVFFlat", 8, id="ivf_at_threshold"),
+        pytest.param(255, "IndexIVFFlat", 15, id="ivf_below_pq_threshold"),
+        pytest.param(256, "IndexIVFPQ", 16, id="ivf_pq_at_threshold"),
+    ],
+)
+def test_build_index_type_by_size(monkeypatch, n_vectors, index_type, nlist):
+    """Test the index type, nlist and nprobe chosen for each corpus size."""
+    # the semantic extras may be missing; only faiss itself is needed here
+    monkeypatch.setattr(router, "faiss", faiss)
+    # scaled-down thresholds keep IVF training fast
+    monkeypatch.setattr(router, "IVF_MIN_VECTORS", 64)
+    monkeypatch.setattr(router, "IVF_PQ_MIN_VECTORS", 256)
+    specs = []
+    index_factory = faiss.index_factory
+
+    def fast_index_factory(dim, spec, metric):
+        # training 8-bit PQ codebooks is slow; the coarser codes keep the layout
+        specs.append(spec)
+        return index_factory(dim, spec.replace("PQ32x8", "PQ4x4"), metric)
+
+    monkeypatch.setattr(faiss, "index_factory", fast_index_factory)
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n_vectors, 32), dtype=np.float32)
+
+    index = _build_index(embeddings)
+
+    assert type(index).__name__ == index_type
+    if index_type == "IndexIVFPQ":
+        assert specs == [f"IVF{nlist},PQ32x8"]
+    else:
+        assert specs == []
+    assert index.ntotal == n_vectors
+    if nlist is None:
+        assert not hasattr(index, "nlist")
+    else:
+        assert index.is_trained
+        assert index.nlist == nlist
+        assert index.nprobe == 8
+
+
+@pytest.mark.parametrize(
+    ("nlist", "nprobe"),
+    [(16, 8), (128, 8), (143, 8), (144, 9), (320, 20), (1000, 62)],
+)
+def test_set_nprobe(nlist, nprobe):
+    """Test nprobe is nlist / 16, but never below 8."""
+    index = SimpleNamespace(nlist=nlist, nprobe=1)
+    _set_nprobe(index)
+    assert index.nprobe == nprobe
+
+
+def test_set_nprobe_ignores_flat_index():
+    """Test flat indexes, which have no IVF lists, are left alone."""
+    index = faiss.IndexFlatIP(DIM)
+    _set_nprobe(index)
+    assert not hasattr(index, "nprobe")
+
+
+@pytest.fixture
+def build_descriptions(monkeypatch):
+    """Isolate the description caches and stub the network fetch."""
+    build = AsyncMock(
+        side_effect=lambda ids: {api_id: api_id.upper() for api_id in ids}
+    )
+    monkeypatch.setattr(router, "_build_api_descriptions", build)
+    monkeypatch.setattr(router, "_load_cached_descriptions", lambda: None)
+    with (
+        patch.dict(router._descriptions_cache, clear=True),
+        patch.dict(router._semantic_cache, descriptions=None, ids=None),
+    ):
+        yield build
+
+
+async def test_get_descriptions_cache_hit(build_descriptions):
+    """Test repeated lookups, in any id order, reuse the first fetch."""
+    first = await _get_descriptions(["api_1", "api_2"])
+    second = await _get_descriptions(["api_2", "api_1"])
+
+    assert first == {"api_1": "API_1", "api_2": "API_2"}
+    assert second is first
+    build_descriptions.assert_awaited_once_with(["api_1", "api_2"])
+
+
+async def test_get_descriptions_evicts_oldest(build_descriptions):
+    """Test the oldest id set is dropped once the cache is full."""
+    for i in range(router.DESCRIPTIONS_CACHE_SIZE + 1):
+        await _get_descriptions([f"api_{i}"])
+
+    assert len(router._descriptions_cache) == router.DESCRIPTIONS_CACHE_SIZE
+    assert ("api_0",) not in router._descriptions_cache
+    assert ("api_1",) in router._descriptions_cache
+
+    await _get_descriptions(["api_0"])
+
+    assert build_descriptions.await_count == router.DESCRIPTIONS_CACHE_SIZE + 2
+    assert ("api_1",) not in router._descriptions_cache
+
+
+@pytest.mark.usefixtures("build_descriptions")
+async def test_get_descriptions_evicts_least_recently_used():
+    """Test a cache hit keeps an id set from being the next one evicted."""
+    for i in range(router.DESCRIPTIONS_CACHE_SIZE):
+        await _get_descriptions([f"api_{i}"])
+    await _get_descriptions(["api_0"])
+    await _get_descriptions(["api_new"])
+
+    assert ("api_0",) in router._descriptions_cache
+    assert ("api_1",) not in router._descriptions_cache
+
+
+async def test_get_descriptions_reuses_semantic_index(build_descriptions):
+    """Test descriptions of the loaded semantic index are used without a fetch."""
+    descriptions = {"api_1": "loaded"}
+    router._semantic_cache.update(descriptions=descriptions, ids=["api_1"])
+
+    assert await _get_descriptions(["api_1"]) is descriptions
+    build_descriptions.assert_not_awaited()
+
+
+@pytest.mark.parametrize(
+    ("text", "categories"),
+    [
+        ("gene expression", {"bioinformatics"}),
+        ("Find GENES for a disease", {"bioinformatics", "clinical"}),
+        ("genomes and biology", {"bioinformatics"}),
+        ("patient phenotypes", {"clinical"}),
+        ("clinical trial publications", {"clinical", "literature"}),
+        ("paper abstracts about protein mutations", {"bioinformatics", "literature"}),
+        ("drug-drug interactions", set()),
+        ("", set()),
+        ("a.b|c (gene)", {"bioinformatics"}),
+    ],
+)
+def test_category_patterns(text, categories):
+    """Test the compiled patterns match exactly the keyword substring checks."""
+    text_lower = text.lower()
+    matched = {
+        category
+        for category, pattern in router.CATEGORY_PATTERNS.items()
+        if pattern.search(text_lower)
+    }
+    substring_matched = {
+        category
+        for category, keywords in router.CATEGORY_KEYWORDS.items()
+        if any(keyword in text_lower for keyword in keywords)
+    }
+    assert matched == categories
+    assert matched == substring_matched
+
+
+async def test_category_routing(build_descriptions):
+    """Test APIs are grouped under the categories the query mentions."""
+    build_descriptions.side_effect = None
+    build_descriptions.return_value = {
+        "api_1": "Gene annotation service",
+        "api_2": "Clinical Trials registry",
+        "api_3": "Publication search",
+    }
+
+    routed = await _category_routing("genes in trials", ["api_1", "api_2", "api_3"])
+
+    assert routed == {"bioinformatics": ["api_1"], "clinical": ["api_2"]}
+    assert await _category_routing("weather", ["api_1"]) == {}
+
+
+async def test_load_model_concurrent_calls_create_once(monkeypatch):
+    """Test concurrent first calls share a single model construction."""
+    created = []
+
+    def slow_create_model():
+        # hold the thread long enough for the second call to wait on the lock
+        time.sleep(0.05)
+        model = object()
+        created.append(model)
+        return model
+
+    monkeypatch.setattr(router, "SentenceTransformer", object)
+    monkeypatch.setattr(router, "_create_model", slow_create_model)
+
+    with patch.dict(router._semantic_cache, model=None):
+        first, second = await asyncio.gather(_load_model(), _load_model())
+        third = await _load_model()
+
+    assert len(created) == 1
+    assert first is second is third is created[0]
+
+
+def test_load_model_on_successive_event_loops(monkeypatch):
+    """Test the model lock works again after a loop it was used in has closed."""
+
+    def slow_create_model():
+        time.sleep(0.01)
+        return object()
+
+    monkeypatch.setattr(router, "SentenceTransformer", object)
+    monkeypatch.setattr(router, "_create_model", slow_create_model)
+
+    async def load_twice():
+        return await asyncio.gather(_load_model(), _load_model())
+
+    with patch.dict(router._semantic_cache, model=None):
+        first = asyncio.run(load_twice())
+        router._semantic_cache["model"] = None
+        # contended again, now from a new loop
+        second = asyncio.run(load_twice())
+
+    assert first[0] is first[1]
+    assert second[0] is second[1]
+    assert second[0] is not first[0]
+
+
+async def test_load_model_without_dependencies(monkeypatch):
+    """Test a clear error is raised when the semantic extras are missing."""
+    monkeypatch.setattr(router, "SentenceTransformer", None)
+
+    with pytest.raises(RuntimeError, match="dependencies unavailable"):
+        await _load_model()
+
+
+@pytest.fixture
+def semantic_deps(monkeypatch):
+    """Enable semantic search with faiss/numpy, even without the model extras."""
+    monkeypatch.setattr(router, "SEMANTIC_SEARCH_AVAILABLE", True)
+    monkeypatch.setattr(router, "faiss", faiss)
+    monkeypatch.setattr(router, "np", np)
+
+
+@pytest.mark.usefixtures("semantic_deps")
+async def test_ensure_semantic_index_reuses_loaded_index(monkeypatch):
+    """Test the in-memory index is returned without reading the disk cache."""
+    load_cached = Mock(return_value=None)
+    monkeypatch.setattr(router, "_load_cached_descriptions", load_cached)
+    index = _make_index()
+    ids = ["api_1", "api_2"]
+    descriptions = {"api_1": "first", "api_2": "second"}
+
+    with patch.dict(
+        router._semantic_cache, index=index, ids=ids, descriptions=descriptions
+    ):
+        loaded = await _ensure_semantic_index(["api_2", "api_1"])
+
+    assert loaded == (index, ids, descriptions)
+    load_cached.assert_not_called()
+
+
+@pytest.mark.usefixtures("semantic_deps")
+async def test_smart_search_batches_concurrent_queries(monkeypatch, encode_calls):
+    """Test concurrent searches share one index build and one encode call."""
+    descriptions = {f"api_{i}": text for i, text in enumerate("abcd")}
+    monkeypatch.setattr(router, "_load_model", AsyncMock(return_value=_make_model()))
+    monkeypatch.setattr(router, "_load_cached_descriptions", lambda: None)
+    monkeypatch.setattr(
+        router, "_get_descriptions", AsyncMock(return_value=descriptions)
+    )
+    monkeypatch.setattr(router, "_save_cached_descriptions", Mock())
+    monkeypatch.setattr(router, "_save_cached_index", Mock())
+    monkeypatch.setattr(router, "_query_batcher", QueryBatcher(max_wait=0.05))
+
+    with patch.dict(
+        router._semantic_cache, index=None, ids=None, ids_array=None, descriptions=None
+    ):
+        first, second = await asyncio.gather(
+            smart_search_smartapi("a", list(descriptions), limit=1),
+            smart_search_smartapi("b", list(descriptions), limit=1),
+        )
+
+    # one encode for the index, then one for both queries
+    assert len(encode_calls) == 2
+    assert encode_calls[0] == ["a", "b", "c", "d"]
+    assert sorted(encode_calls[1]) == ["a", "b"]
+    assert list(first["results"]) == ["api_0"]
+    assert list(second["results"]) == ["api_1"]
@@ -2,22 +2,75 @@
 Tests for smartapi-mcp.smartapi module
 """
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import pytest_asyncio
 from fastmcp import FastMCP
 
-from smartapi_mcp import get_mcp_server, get_merged_mcp_server, merge_mcp_servers
+from smartapi_mcp import (
+    get_mcp_server,
+    get_merged_mcp_server,
+    get_smart_mcp_server_with_routing,
+    load_mcp_servers,
+    merge_mcp_servers,
+)
 from smartapi_mcp.smartapi import get_predefined_api_set
 
 test_api_id_1 = "59dce17363dce279d389100834e43648"  # MyGene.info
 test_api_id_2 = "8f08d1446e0bb9c2b323713ce83e2bd3"  # MyChem.info
 
 
+# Building a server fetches and parses its spec, so the biothings_core
+# servers are built once per session, all at once; the tests using them share
+# the "biothings_core" xdist group, so under -n they are built on one worker
+# only. merge_mcp_servers only renames the tools in place, which is safe to
+# repeat.
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def biothings_core_servers():
+    """MCP servers for the biothings_core API set, keyed by SmartAPI ID."""
+    smartapi_ids = get_predefined_api_set("biothings_core")["smartapi_ids"]
+    servers = await asyncio.gather(*(get_mcp_server(sid) for sid in smartapi_ids))
+    return dict(zip(smartapi_ids, servers, strict=True))
+
+
+@pytest.fixture
+def biothings_servers(biothings_core_servers):
+    """MCP servers for test_api_id_1 and test_api_id_2."""
+    return [
+        biothings_core_servers[test_api_id_1],
+        biothings_core_servers[test_api_id_2],
+    ]
+
+
+@pytest.fixture
+def reuse_core_servers(biothings_core_servers, monkeypatch):
+    """Have get_merged_mcp_server reuse the session's biothings_core servers.
+
+    APIs outside biothings_core are still built on demand.
+    """
+
+    async def get_mcp_server_reused(smartapi_id):
+        server = biothings_core_servers.get(smartapi_id)
+        return server if server is not None else await get_mcp_server(smartapi_id)
+
+    monkeypatch.setattr("smartapi_mcp.server.get_mcp_server", get_mcp_server_reused)
+
+
+@pytest.fixture
+def mygene_server(biothings_core_servers):
+    """MCP server for MyGene.info (test_api_id_1), shared by the session."""
+    return biothings_core_servers[test_api_id_1]
+
+
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
-async def test_get_mcp_server():
+async def test_get_mcp_server(mygene_server):
     """Test get_mcp_server can create a MCP server based on a SmartAPI id."""
-    server = await get_mcp_server(test_api_id_1)
+    server = mygene_server
     assert isinstance(server, FastMCP)
     tools = await server.get_tools()
     assert len(tools) >= 4
@@ -25,11 +78,34 @@ async def test_get_mcp_server():
 
 
 @pytest.mark.asyncio
-async def test_merge_mcp_servers():
+@patch("smartapi_mcp.server.create_mcp_server_async", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.cached_spec_path")
+@patch("smartapi_mcp.server.aload_api_spec", new_callable=AsyncMock)
+async def test_get_mcp_server_uses_saved_spec(
+    mock_aload, mock_cached_path, mock_create, tmp_path
+):
+    """Test get_mcp_server hands awslabs the saved spec instead of its URL."""
+    mock_aload.return_value = {
+        "info": {"title": "Test API"},
+        "servers": [{"url": "https://api.example.org"}],
+    }
+    mock_cached_path.return_value = tmp_path / "test_id.json"
+
+    await get_mcp_server("test_id")
+
+    config = mock_create.call_args.args[0]
+    assert config.api_spec_path == str(tmp_path / "test_id.json")
+    assert not config.api_spec_url
+    assert config.api_base_url == "https://api.example.org"
+
+
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache")
+@pytest.mark.xdist_group("biothings_core")
+@pytest.mark.asyncio
+async def test_merge_mcp_servers(biothings_servers):
     """Test merge_mcp_servers helper function."""
-    list_of_servers = [
-        await get_mcp_server(sid) for sid in [test_api_id_1, test_api_id_2]
-    ]
+    list_of_servers = list(biothings_servers)
     merged_server = await merge_mcp_servers(list_of_servers)
     assert isinstance(merged_server, FastMCP)
     assert merged_server.name == "merged_mcp"
@@ -37,6 +113,8 @@ async def test_merge_mcp_servers():
     assert len(tools) >= 8
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server():
     """Test merge_mcp_servers helper function."""
@@ -64,14 +142,11 @@ async def test_get_merged_mcp_server():
 
 
 @pytest.mark.asyncio
-async def test_merge_mcp_servers_no_accessible_tools():
+async def test_merge_mcp_servers_no_accessible_tools(make_mock_server):
     """Test merge_mcp_servers raises AttributeError when server has no accessible
     tools."""
-    # Create a mock server that will trigger the AttributeError path
-    mock_server = MagicMock()
-    mock_server.name = "Mock Server"
-    # Make get_tools return empty dict to simulate server without accessible tools
-    mock_server.get_tools = AsyncMock(return_value={})
+    # A server without tools triggers the AttributeError path
+    mock_server = make_mock_server("Mock Server")
 
     with pytest.raises(AttributeError) as exc_info:
         await merge_mcp_servers([mock_server])
@@ -80,6 +155,8 @@ async def test_merge_mcp_servers_no_accessible_tools():
     assert "does not have accessible tools" in str(exc_info.value)
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_failure():
     """Test failure of get_merged_mcp_server helper function."""
@@ -87,6 +164,9 @@ async def test_get_merged_mcp_server_failure():
         await get_merged_mcp_server(smartapi_q="_id:unknown_id")
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_with_api_set():
     """Test get_merged_mcp_server with predefined API sets."""
@@ -99,6 +179,9 @@ async def test_get_merged_mcp_server_with_api_set():
     assert len(tools) >= 16  # Each API typically has 4+ tools
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_with_api_set_and_exclusions():
     """Test get_merged_mcp_server with API set and exclusions."""
@@ -115,6 +198,9 @@ async def test_get_merged_mcp_server_with_api_set_and_exclusions():
     assert len(tools) >= 12  # From 4 remaining APIs
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_with_single_smartapi_id():
     """Test get_merged_mcp_server with single smartapi_id parameter."""
@@ -127,6 +213,9 @@ async def test_get_merged_mcp_server_with_single_smartapi_id():
     assert len(tools) <= 8  # Reasonable upper bound for single API
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_with_custom_server_name():
     """Test get_merged_mcp_server with custom server name."""
@@ -147,18 +236,22 @@ async def test_get_merged_mcp_server_no_ids_provided():
     assert "No SmartAPI IDs provided or found" in str(exc_info.value)
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
-async def test_merge_mcp_servers_with_custom_name():
+async def test_merge_mcp_servers_with_custom_name(biothings_servers):
     """Test merge_mcp_servers with custom merged server name."""
-    list_of_servers = [
-        await get_mcp_server(sid) for sid in [test_api_id_1, test_api_id_2]
-    ]
+    list_of_servers = list(biothings_servers)
     custom_name = "custom_merged_server"
     merged_server = await merge_mcp_servers(list_of_servers, custom_name)
     assert isinstance(merged_server, FastMCP)
     assert merged_server.name == custom_name
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_api_set_with_exclude_overrides():
     """
@@ -180,6 +273,9 @@ async def test_get_merged_mcp_server_api_set_with_exclude_overrides():
     assert len(tools) >= 8
 
 
+@pytest.mark.network
+@pytest.mark.usefixtures("registry_cache", "reuse_core_servers")
+@pytest.mark.xdist_group("biothings_core")
 @pytest.mark.asyncio
 async def test_get_merged_mcp_server_with_duplicate_ids():
     """Test get_merged_mcp_server handles duplicate IDs correctly."""
@@ -194,65 +290,119 @@ async def test_get_merged_mcp_server_with_duplicate_ids():
 
 
 @pytest.mark.asyncio
-async def test_get_merged_mcp_server_api_set_with_builtin_exclude_ids():
-    """Test API set that contains 'smartapi_exclude_ids'."""
-    # First verify that biothings_all has exclude IDs
+@patch("smartapi_mcp.server.merge_mcp_servers", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.get_mcp_server", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.aload_api_specs", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.get_smartapi_ids", new_callable=AsyncMock)
+async def test_get_merged_mcp_server_api_set_with_builtin_exclude_ids(
+    mock_get_ids, mock_aload_specs, mock_get_mcp_server, mock_merge, make_mock_server
+):
+    """Test the exclude IDs built into an API set are applied."""
     api_set_args = get_predefined_api_set("biothings_all")
-    assert "smartapi_exclude_ids" in api_set_args  # Fixed key name
+    assert "1c9be9e56f93f54192dcac203f21c357" in api_set_args["smartapi_exclude_ids"]
+
+    mock_get_ids.return_value = [
+        "59dce17363dce279d389100834e43648",  # MyGene.info (should be included)
+        "1c9be9e56f93f54192dcac203f21c357",  # mab API (should be excluded)
+    ]
+    mock_aload_specs.side_effect = lambda smartapi_ids: {
+        sid: {} for sid in smartapi_ids
+    }
+    mock_get_mcp_server.side_effect = make_mock_server
+
+    await get_merged_mcp_server(api_set="biothings_all")
+
+    mock_get_ids.assert_awaited_once_with(api_set_args["smartapi_q"])
+    mock_get_mcp_server.assert_awaited_once_with("59dce17363dce279d389100834e43648")
+    merged_servers = mock_merge.await_args.args[0]
+    assert [server.name for server in merged_servers] == [
+        "59dce17363dce279d389100834e43648"
+    ]
 
-    with patch("smartapi_mcp.server.get_smartapi_ids") as mock_get_ids:
-        # Return some test IDs that include both included and excluded ones
-        mock_get_ids.return_value = [
-            "59dce17363dce279d389100834e43648",  # MyGene.info (should be included)
-            "1c9be9e56f93f54192dcac203f21c357",  # mab API (should be excluded)
-        ]
 
-        # This should use the biothings_all query and exclude IDs
-        try:
-            merged_server = await get_merged_mcp_server(api_set="biothings_all")
+@pytest.mark.asyncio
+async def test_merge_mcp_servers_special_characters_in_name(make_mock_server):
+    """Test merge_mcp_servers handles special characters in server names."""
+    mock_server1 = make_mock_server("API with spaces & symbols!", tools=["tool1"])
+    mock_server2 = make_mock_server("API-with-dashes_and_underscores", tools=["tool2"])
+    (tool1,) = (await mock_server1.get_tools()).values()
+    (tool2,) = (await mock_server2.get_tools()).values()
 
-            # Verify server was created
-            assert isinstance(merged_server, FastMCP)
-            tools = await merged_server.get_tools()
+    merged_server = await merge_mcp_servers([mock_server1, mock_server2])
 
-            # Should only have tools from MyGene (the excluded API should
-            # not be present)
-            # The exact number depends on the API, but it should be > 0
-            assert len(tools) >= 4
+    # Tools are renamed {sanitized_api_name}_{original_tool_key}
+    assert tool1.name == "api_with_spaces___symbols__tool1"
+    assert tool2.name == "api-with-dashes_and_underscores_tool2"
 
-        except Exception as e:
-            # If there are issues with the actual API calls, that's okay for this test
-            # The important thing is that we exercised line 85
-            print(f"Note: API call may have failed, but we tested line 85: {e}")
+    # and added to the merged server under their new names
+    for name in (tool1.name, tool2.name):
+        merged_tool = await merged_server.get_tool(name)
+        assert merged_tool is not None
+        assert merged_tool.name == name
 
 
 @pytest.mark.asyncio
-async def test_merge_mcp_servers_special_characters_in_name():
-    """Test merge_mcp_servers handles special characters in server names."""
-    mock_server1 = MagicMock()
-    mock_server1.name = "API with spaces & symbols!"
-    mock_tool1 = MagicMock()
-    mock_tool1.name = "original_tool_1"
-    mock_server1.get_tools = AsyncMock(return_value={"tool1": mock_tool1})
-    mock_server1.get_prompts = AsyncMock(return_value={})
-
-    mock_server2 = MagicMock()
-    mock_server2.name = "API-with-dashes_and_underscores"
-    mock_tool2 = MagicMock()
-    mock_tool2.name = "original_tool_2"
-    mock_server2.get_tools = AsyncMock(return_value={"tool2": mock_tool2})
-    mock_server2.get_prompts = AsyncMock(return_value={})
+async def test_load_mcp_servers_skips_failures():
+    """Test load_mcp_servers keeps input order and skips APIs that fail."""
+    servers = {"id_1": MagicMock(), "id_3": MagicMock()}
 
-    merged_server = await merge_mcp_servers([mock_server1, mock_server2])
+    async def fake_get_mcp_server(smartapi_id):
+        if smartapi_id not in servers:
+            err_msg = f"cannot load {smartapi_id}"
+            raise ValueError(err_msg)
+        return servers[smartapi_id]
+
+    async def fake_aload_api_specs(smartapi_ids):
+        return {sid: {} for sid in smartapi_ids}
+
+    with (
+        patch("smartapi_mcp.server.aload_api_specs", fake_aload_api_specs),
+        patch("smartapi_mcp.server.get_mcp_server", side_effect=fake_get_mcp_server),
+    ):
+        result = await load_mcp_servers(["id_1", "id_2", "id_3"])
+
+    assert result == [servers["id_1"], servers["id_3"]]
 
-    tools = await merged_server.get_tools()
 
-    # Verify that special characters were sanitized in tool names
-    # The merge function should rename tools with sanitized API names
-    # Check that the tools got the correct names
-    # Pattern is: {sanitized_api_name}_{original_tool_key}
-    assert mock_tool1.name == "api_with_spaces___symbols__tool1"
-    assert mock_tool2.name == "api-with-dashes_and_underscores_tool2"
+@pytest.mark.asyncio
+async def test_load_mcp_servers_skips_failed_spec_fetches():
+    """Test load_mcp_servers does not build servers whose spec failed to load."""
+    server = MagicMock()
+
+    async def fake_aload_api_specs(smartapi_ids):
+        return {
+            sid: {} if sid == "id_1" else ValueError("not found")
+            for sid in smartapi_ids
+        }
+
+    with (
+        patch("smartapi_mcp.server.aload_api_specs", fake_aload_api_specs),
+        patch(
+            "smartapi_mcp.server.get_mcp_server", new_callable=AsyncMock
+        ) as mock_get_mcp_server,
+    ):
+        mock_get_mcp_server.return_value = server
+        result = await load_mcp_servers(["id_1", "id_2"])
+
+    assert result == [server]
+    mock_get_mcp_server.assert_awaited_once_with("id_1")
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.server.merge_mcp_servers", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.load_mcp_servers", new_callable=AsyncMock)
+@patch("smartapi_mcp.server.get_smartapi_ids", new_callable=AsyncMock)
+async def test_smart_server_small_set_queries_registry_once(
+    mock_get_ids, mock_load_servers, mock_merge
+):
+    """Test the small-set fallback reuses the IDs already resolved from a query."""
+    mock_get_ids.return_value = ["id_1", "id_2", "id_3"]
+    mock_load_servers.return_value = []
+
+    await get_smart_mcp_server_with_routing(
+        smartapi_q="tags.name:test", smartapi_exclude_ids=["id_2"]
+    )
 
-    # Verify tools were added to merged server
-    assert len(tools) == 2
+    mock_get_ids.assert_awaited_once_with("tags.name:test")
+    mock_load_servers.assert_awaited_once_with(["id_1", "id_3"])
+    mock_merge.assert_awaited_once_with([], "smartapi_mcp")
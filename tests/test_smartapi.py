@@ -2,38 +2,76 @@
 Tests for smartapi-mcp.smartapi module
 """
 
+import asyncio
+import re
+import threading
+import time
 from unittest.mock import patch
 
+import httpx
 import pytest
+import pytest_asyncio
 
+from smartapi_mcp import __version__, smartapi
 from smartapi_mcp.smartapi import (
+    BIOTHINGS_ALL_EXCLUDED_IDS,
+    BIOTHINGS_ALL_QUERY,
+    BIOTHINGS_CORE_IDS,
+    BIOTHINGS_TEST_IDS,
+    MAX_RETRIES,
     PREDEFINED_API_SETS,
+    QUERY_CACHE_TTL,
+    RETRY_MAX_DELAY,
+    AsyncSmartAPIClient,
+    _get_client,
+    _parse_retry_after,
+    aload_api_spec,
+    close_client,
     get_base_server_url,
     get_predefined_api_set,
     get_smartapi_ids,
+    json_dumps,
+    json_loads,
     load_api_spec,
+    sanitize_api_name,
 )
 
 test_api_id = "59dce17363dce279d389100834e43648"  # MyGene.info
 
 
+@pytest.fixture(autouse=True)
+def clear_registry_caches():
+    """Keep cached specs and query results from leaking between tests."""
+    load_api_spec.cache_clear()
+    with (
+        patch.dict("smartapi_mcp.smartapi._query_cache", clear=True),
+        patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True),
+    ):
+        yield
+
+
 def test_package_imports():
     """Test that smartapi helper function imports work correctly."""
     assert get_base_server_url is not None
     assert get_smartapi_ids is not None
 
 
-@pytest.mark.asyncio
-async def test_get_smartapi_ids():
-    """Test get_smartapi_ids helper function."""
-    id_list = await get_smartapi_ids(q=test_api_id)
-    assert len(id_list) == 1
-    assert id_list[0] == test_api_id
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def biothings_ids():
+    """All SmartAPI IDs tagged biothings, fetched in one query per session."""
+    return await get_smartapi_ids(q="tags.name:biothings")
+
 
-    id_list = await get_smartapi_ids(q="tags.name:biothings")
-    assert len(id_list) >= 30
+@pytest.mark.network
+def test_get_smartapi_ids(biothings_ids):
+    """Test get_smartapi_ids helper function."""
+    assert test_api_id in biothings_ids
+    assert len(biothings_ids) >= 30
 
 
+@pytest.mark.network
+@pytest.mark.xdist_group("mygene")
+@pytest.mark.usefixtures("registry_cache")
 def test_get_api_spec():
     api_spec = load_api_spec(test_api_id)
     info = api_spec["info"]
@@ -43,6 +81,9 @@ def test_get_api_spec():
     assert info["title"] == "MyGene.info API"
 
 
+@pytest.mark.network
+@pytest.mark.xdist_group("mygene")
+@pytest.mark.usefixtures("registry_cache")
 def test_get_base_server_url():
     """Test server info method."""
     api_spec = load_api_spec(test_api_id)
@@ -50,94 +91,110 @@ def test_get_base_server_url():
     assert base_url == "https://mygene.info/v3"
 
 
-def test_get_base_server_url_single_server():
-    """Test get_base_server_url with single server."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [{"url": "https://api.example.com"}],
-    }
-    base_url = get_base_server_url(api_spec)
-    assert base_url == "https://api.example.com"
-
-
-def test_get_base_server_url_multiple_servers_with_production():
-    """Test get_base_server_url with multiple servers and production server."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [
-            {"url": "https://dev.api.example.com", "description": "Development server"},
-            {
-                "url": "https://api.example.com",
-                "description": "Production server on https",
-            },
-            {"url": "https://staging.api.example.com", "description": "Staging server"},
-        ],
-    }
-    base_url = get_base_server_url(api_spec)
-    assert base_url == "https://api.example.com"
-
-
-def test_get_base_server_url_multiple_servers_with_production_keyword():
-    """Test get_base_server_url with multiple servers and Production keyword."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [
-            {"url": "https://dev.api.example.com", "description": "Development server"},
-            {"url": "https://api.example.com", "description": "Production environment"},
-            {"url": "https://staging.api.example.com", "description": "Staging server"},
-        ],
-    }
-    base_url = get_base_server_url(api_spec)
-    assert base_url == "https://api.example.com"
-
-
-def test_get_base_server_url_multiple_servers_with_ci_transltr():
-    """Test get_base_server_url with multiple servers and ci.transltr.io server."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [
-            {"url": "https://dev.api.example.com", "description": "Development server"},
-            {
-                "url": "https://api.ci.transltr.io/test",
-                "description": "CI Translator server",
-            },
-            {"url": "https://staging.api.example.com", "description": "Staging server"},
-        ],
-    }
-    base_url = get_base_server_url(api_spec)
-    assert base_url == "https://api.ci.transltr.io/test"
-
-
-def test_get_base_server_url_no_suitable_server():
+_DEV_SERVER = {
+    "url": "https://dev.api.example.com",
+    "description": "Development server",
+}
+_STAGING_SERVER = {
+    "url": "https://staging.api.example.com",
+    "description": "Staging server",
+}
+_CI_SERVER = {
+    "url": "https://api.ci.transltr.io/test",
+    "description": "CI Translator server",
+}
+
+
+@pytest.mark.parametrize(
+    ("servers", "expected_url"),
+    [
+        pytest.param(
+            [{"url": "https://api.example.com"}],
+            "https://api.example.com",
+            id="single_server",
+        ),
+        pytest.param(
+            [
+                _DEV_SERVER,
+                {
+                    "url": "https://api.example.com",
+                    "description": "Production server on https",
+                },
+                _STAGING_SERVER,
+            ],
+            "https://api.example.com",
+            id="production_server",
+        ),
+        pytest.param(
+            [
+                _DEV_SERVER,
+                {"url": "https://api.example.com", "description": "Production env"},
+                _STAGING_SERVER,
+            ],
+            "https://api.example.com",
+            id="production_keyword",
+        ),
+        pytest.param(
+            [_DEV_SERVER, _CI_SERVER, _STAGING_SERVER],
+            "https://api.ci.transltr.io/test",
+            id="ci_transltr",
+        ),
+        pytest.param(
+            [
+                _DEV_SERVER,
+                {"url": "https://api.example.com", "description": "Production server"},
+                _CI_SERVER,
+            ],
+            "https://api.example.com",
+            id="first_preferred_server_wins",
+        ),
+        pytest.param(
+            [
+                {"url": "https://dev.api.example.com", "description": None},
+                {"url": "https://api.example.com", "description": "Production server"},
+            ],
+            "https://api.example.com",
+            id="null_description",
+        ),
+        pytest.param(
+            [
+                {"url": "https://dev.api.example.com"},
+                {
+                    "url": "https://api.example.com",
+                    "description": "Production server on https",
+                },
+            ],
+            "https://api.example.com",
+            id="server_without_description",
+        ),
+    ],
+)
+def test_get_base_server_url_selection(servers, expected_url):
+    """Test get_base_server_url picks the right server from the servers list."""
+    api_spec = {"info": {"title": "Test API"}, "servers": servers}
+    assert get_base_server_url(api_spec) == expected_url
+
+
+@pytest.mark.parametrize(
+    "servers",
+    [
+        pytest.param([_DEV_SERVER, _STAGING_SERVER], id="no_preferred_server"),
+        pytest.param([{"url": ""}], id="single_server_without_url"),
+        pytest.param(
+            [_DEV_SERVER, {"url": None, "description": "Production server"}],
+            id="production_server_without_url",
+        ),
+        pytest.param([], id="no_servers"),
+    ],
+)
+def test_get_base_server_url_no_suitable_server(servers):
     """Test get_base_server_url raises ValueError when no suitable server found."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [
-            {"url": "https://dev.api.example.com", "description": "Development server"},
-            {"url": "https://staging.api.example.com", "description": "Staging server"},
-        ],
-    }
-    with pytest.raises(ValueError, match="Cannot determine server URL") as exc_info:
+    api_spec = {"info": {"title": "Test API"}, "servers": servers}
+    with pytest.raises(
+        ValueError, match="Cannot determine server URL for API: test_api"
+    ):
         get_base_server_url(api_spec)
 
-    assert "Cannot determine server URL for API: test_api" in str(exc_info.value)
-
-
-def test_get_base_server_url_server_without_description():
-    """Test get_base_server_url with servers that have no description."""
-    api_spec = {
-        "info": {"title": "Test API"},
-        "servers": [
-            {"url": "https://dev.api.example.com"},
-            {
-                "url": "https://api.example.com",
-                "description": "Production server on https",
-            },
-        ],
-    }
-    base_url = get_base_server_url(api_spec)
-    assert base_url == "https://api.example.com"
-
 
 @patch("smartapi_mcp.smartapi.load_openapi_spec")
 @patch("smartapi_mcp.smartapi.validate_openapi_spec")
@@ -159,6 +216,49 @@ def test_load_api_spec_validation_warning(mock_logger, mock_validate, mock_load)
     )
 
 
+@patch("smartapi_mcp.smartapi.load_openapi_spec")
+@patch("smartapi_mcp.smartapi.validate_openapi_spec")
+def test_load_api_spec_skip_validation(mock_validate, mock_load, monkeypatch):
+    """Test load_api_spec skips validation when asked to, or via the env var."""
+    mock_load.return_value = {"info": {"title": "Test API"}}
+
+    load_api_spec("test_id", validate=False)
+    mock_validate.assert_not_called()
+
+    monkeypatch.setenv("SMARTAPI_SKIP_VALIDATE", "1")
+    load_api_spec("other_id")
+    mock_validate.assert_not_called()
+
+    load_api_spec("third_id", validate=True)
+    mock_validate.assert_called_once()
+
+
+@patch("smartapi_mcp.smartapi.load_openapi_spec")
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+def test_load_api_spec_cached(mock_validate, mock_load):
+    """Test load_api_spec fetches and validates each SmartAPI ID once."""
+    mock_load.return_value = {"info": {"title": "Test API"}}
+
+    first = load_api_spec("test_id")
+    second = load_api_spec("test_id")
+
+    assert second is first
+    mock_load.assert_called_once()
+    mock_validate.assert_called_once()
+
+
+@patch("smartapi_mcp.smartapi.load_openapi_spec")
+@patch("smartapi_mcp.smartapi.validate_openapi_spec")
+def test_load_api_spec_reuses_async_fetch(mock_validate, mock_load):
+    """Test load_api_spec reuses a spec already fetched by aload_api_spec."""
+    api_spec = {"info": {"title": "Test API"}}
+    with patch.dict("smartapi_mcp.smartapi._spec_cache", {"test_id": api_spec}):
+        assert load_api_spec("test_id", validate=True) is api_spec
+
+    mock_load.assert_not_called()
+    mock_validate.assert_not_called()
+
+
 @patch("smartapi_mcp.smartapi.load_openapi_spec")
 @patch("smartapi_mcp.smartapi.validate_openapi_spec")
 @patch("smartapi_mcp.smartapi.logger")
@@ -192,8 +292,7 @@ def test_get_predefined_api_set_biothings_core():
         "671b45c0301c8624abbd26ae78449ca2",  # MyDisease.info
         "85139f4dccfcefa3ac3042372066916d",  # MyGeneSet.info
     ]
-    for expected_id in expected_ids:
-        assert expected_id in result["smartapi_ids"]
+    assert set(expected_ids).issubset(result["smartapi_ids"])
 
 
 def test_get_predefined_api_set_biothings_test():
@@ -213,8 +312,7 @@ def test_get_predefined_api_set_biothings_test():
         "85139f4dccfcefa3ac3042372066916d",  # MyGeneSet.info
         "1d288b3a3caf75d541ffaae3aab386c8",  # SemmedDB
     ]
-    for expected_id in expected_ids:
-        assert expected_id in result["smartapi_ids"]
+    assert set(expected_ids).issubset(result["smartapi_ids"])
 
 
 def test_get_predefined_api_set_biothings_all():
@@ -241,9 +339,25 @@ def test_get_predefined_api_set_biothings_all():
         "f339b28426e7bf72028f60feefcd7465",  # GO Cellular Component API
         "34bad236d77bea0a0ee6c6cba5be54a6",  # GO Molecular Function API
     ]
-    assert len(result["smartapi_exclude_ids"]) == 5
-    for expected_id in expected_exclusions:
-        assert expected_id in result["smartapi_exclude_ids"]
+    assert result["smartapi_exclude_ids"] == expected_exclusions
+
+
+def test_get_predefined_api_set_returns_fresh_lists():
+    """Test API sets are built from the module constants without sharing them."""
+    core = get_predefined_api_set("biothings_core")["smartapi_ids"]
+    assert core == list(BIOTHINGS_CORE_IDS)
+    assert get_predefined_api_set("biothings_test")["smartapi_ids"] == list(
+        BIOTHINGS_TEST_IDS
+    )
+    all_set = get_predefined_api_set("biothings_all")
+    assert all_set["smartapi_q"] == BIOTHINGS_ALL_QUERY
+    assert set(all_set["smartapi_exclude_ids"]) == BIOTHINGS_ALL_EXCLUDED_IDS
+
+    # callers may mutate the returned lists without affecting later calls
+    core.clear()
+    assert get_predefined_api_set("biothings_core")["smartapi_ids"] == list(
+        BIOTHINGS_CORE_IDS
+    )
 
 
 def test_get_predefined_api_set_unknown_set():
@@ -265,3 +379,334 @@ def test_predefined_api_sets_constant():
     assert len(PREDEFINED_API_SETS) == 3
     for expected_set in expected_sets:
         assert expected_set in PREDEFINED_API_SETS
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+@patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True)
+async def test_aload_api_spec_cached(mock_validate, tmp_path):
+    """Test aload_api_spec fetches a spec once and then serves it from cache."""
+    mock_spec = {"info": {"title": "Test API"}}
+    requested_urls = []
+
+    def handler(request):
+        requested_urls.append(str(request.url))
+        return httpx.Response(200, json=mock_spec)
+
+    with patch("smartapi_mcp.smartapi.SPEC_CACHE_DIR", tmp_path):
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            first = await aload_api_spec("test_id", client)
+            second = await aload_api_spec("test_id", client)
+
+    assert first == mock_spec
+    assert second is first
+    assert requested_urls == ["https://smart-api.info/api/metadata/test_id"]
+    mock_validate.assert_called_once_with(mock_spec)
+    # no ETag was sent, so the spec is saved but cannot be revalidated
+    assert [path.name for path in tmp_path.iterdir()] == ["test_id.json"]
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+async def test_aload_api_spec_deduplicates_inflight(mock_validate, tmp_path):
+    """Test concurrent aload_api_spec calls for one ID share a single request."""
+    mock_spec = {"info": {"title": "Test API"}}
+    requests_seen = []
+
+    async def handler(request):
+        requests_seen.append(str(request.url))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=mock_spec)
+
+    with (
+        patch("smartapi_mcp.smartapi.SPEC_CACHE_DIR", tmp_path),
+        patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True),
+    ):
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            results = await asyncio.gather(
+                *(aload_api_spec("test_id", client) for _ in range(3))
+            )
+
+    assert results == [mock_spec] * 3
+    assert len(requests_seen) == 1
+    mock_validate.assert_called_once_with(mock_spec)
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+async def test_aload_api_spec_etag_revalidation(mock_validate, tmp_path):
+    """Test aload_api_spec revalidates its on-disk cache with If-None-Match."""
+    mock_spec = {"info": {"title": "Test API"}}
+    if_none_match = []
+
+    def handler(request):
+        if_none_match.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=mock_spec, headers={"ETag": '"v1"'})
+
+    with patch("smartapi_mcp.smartapi.SPEC_CACHE_DIR", tmp_path):
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(2):
+                # clear the in-process cache to simulate a new process
+                with patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True):
+                    assert await aload_api_spec("test_id", client) == mock_spec
+
+    assert if_none_match == [None, '"v1"']
+    meta = json_loads((tmp_path / "test_id.meta.json").read_bytes())
+    assert meta == {"etag": '"v1"'}
+    mock_validate.assert_called_once_with(mock_spec)
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+async def test_aload_api_spec_max_age_and_last_modified(mock_validate, tmp_path):
+    """Test fresh cached specs skip the request and stale ones are revalidated."""
+    mock_spec = {"info": {"title": "Test API"}}
+    last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers.get("If-Modified-Since"))
+        if request.headers.get("If-Modified-Since") == last_modified:
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            json=mock_spec,
+            headers={"Last-Modified": last_modified, "Cache-Control": "max-age=60"},
+        )
+
+    async def load_in_new_process(client):
+        with patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True):
+            return await aload_api_spec("test_id", client)
+
+    with patch("smartapi_mcp.smartapi.SPEC_CACHE_DIR", tmp_path):
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            assert await load_in_new_process(client) == mock_spec
+            # within max-age: served from disk without a request
+            assert await load_in_new_process(client) == mock_spec
+            assert seen_headers == [None]
+            # once expired: revalidated with If-Modified-Since
+            with patch("smartapi_mcp.smartapi.time.time", return_value=1e12):
+                assert await load_in_new_process(client) == mock_spec
+            assert seen_headers == [None, last_modified]
+
+    mock_validate.assert_called_once_with(mock_spec)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_helpers_roundtrip(use_orjson):
+    """Test json_loads/json_dumps with and without orjson installed."""
+    obj = {"ids": ["a", "b"], "info": {"title": "Test API", "version": 1}}
+    orjson = pytest.importorskip("orjson") if use_orjson else None
+    with patch("smartapi_mcp.smartapi.orjson", orjson):
+        data = json_dumps(obj)
+        assert isinstance(data, bytes)
+        assert json_loads(data) == obj
+        with pytest.raises(ValueError):
+            json_loads(b"{not json")
+
+
+@pytest.mark.asyncio
+async def test_shared_client_reused_until_closed():
+    """Test the registry client is shared across calls and reset on close."""
+    client = _get_client()
+    assert _get_client() is client
+    assert client.headers["User-Agent"].startswith(f"smartapi-mcp/{__version__} ")
+    assert client.headers["Accept"] == "application/json"
+    await close_client()
+    assert client.is_closed
+    new_client = _get_client()
+    assert new_client is not client
+    await close_client()
+
+
+def test_get_client_closes_client_of_closed_loop(monkeypatch):
+    """Test a client left by a finished event loop is closed on rebinding."""
+    monkeypatch.setattr(smartapi, "_client", None)
+    monkeypatch.setattr(smartapi, "_client_loop", None)
+
+    async def get_client():
+        return _get_client()
+
+    old_client = asyncio.run(get_client())
+
+    async def rebind():
+        new_client = _get_client()
+        await asyncio.gather(*smartapi._closing_tasks)
+        await close_client()
+        return new_client
+
+    assert asyncio.run(rebind()) is not old_client
+    assert old_client.is_closed
+
+
+async def test_get_client_closes_client_on_its_running_loop(monkeypatch):
+    """Test a client of a loop still running elsewhere is closed on that loop."""
+    monkeypatch.setattr(smartapi, "_client", None)
+    monkeypatch.setattr(smartapi, "_client_loop", None)
+
+    async def get_client():
+        return _get_client()
+
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        old_client = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result()
+
+        new_client = _get_client()
+        for _ in range(100):
+            if old_client.is_closed:
+                break
+            await asyncio.sleep(0.01)
+
+        assert new_client is not old_client
+        assert old_client.is_closed
+        await close_client()
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("MyGene.info API", "mygene_info_api"),
+        ("already_clean-name1", "already_clean-name1"),
+        ("Café (β) API", "caf______api"),
+        ("", ""),
+    ],
+)
+def test_sanitize_api_name(name, expected):
+    """Test sanitize_api_name matches the [^a-z0-9_-] -> "_" substitution."""
+    assert sanitize_api_name(name) == expected
+    assert sanitize_api_name(name) == re.sub(r"[^a-z0-9_-]", "_", name.lower())
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.asyncio.sleep")
+async def test_get_smartapi_ids_retries_server_errors(mock_sleep):
+    """Test get_smartapi_ids retries 5xx responses and honours Retry-After."""
+    responses = iter(
+        [
+            httpx.Response(503, headers={"Retry-After": "2"}),
+            httpx.Response(502),
+            httpx.Response(200, json={"hits": [{"_id": "id_1"}, {"_id": "id_2"}]}),
+        ]
+    )
+    transport = httpx.MockTransport(lambda _request: next(responses))
+    async with httpx.AsyncClient(transport=transport) as client:
+        with patch("smartapi_mcp.smartapi._get_client", return_value=client):
+            assert await get_smartapi_ids("q") == ["id_1", "id_2"]
+
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays[0] == 2.0
+    # second attempt uses equal jitter: between half and all of 0.5 * 2**1
+    assert 0.5 <= delays[1] <= 1.0
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.asyncio.sleep")
+async def test_get_smartapi_ids_caps_retry_after(mock_sleep):
+    """Test a long Retry-After is capped at RETRY_MAX_DELAY."""
+    responses = iter(
+        [
+            httpx.Response(503, headers={"Retry-After": "3600"}),
+            httpx.Response(200, json={"hits": [{"_id": "id_1"}]}),
+        ]
+    )
+    transport = httpx.MockTransport(lambda _request: next(responses))
+    async with httpx.AsyncClient(transport=transport) as client:
+        with patch("smartapi_mcp.smartapi._get_client", return_value=client):
+            assert await get_smartapi_ids("q") == ["id_1"]
+
+    mock_sleep.assert_awaited_once_with(RETRY_MAX_DELAY)
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.asyncio.sleep")
+async def test_get_smartapi_ids_retry_limits(mock_sleep):
+    """Test client errors are not retried and server errors stop retrying."""
+    for status, expected_calls in [(404, 1), (500, MAX_RETRIES + 1)]:
+        calls = []
+
+        def handler(request, status=status, calls=calls):
+            calls.append(request)
+            return httpx.Response(status)
+
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            with (
+                patch("smartapi_mcp.smartapi._get_client", return_value=client),
+                pytest.raises(httpx.HTTPStatusError),
+            ):
+                await get_smartapi_ids("q")
+        assert len(calls) == expected_calls
+    assert mock_sleep.call_count == MAX_RETRIES
+
+
+def test_parse_retry_after():
+    """Test Retry-After parsing for seconds, HTTP dates and junk values."""
+    assert _parse_retry_after("3") == 3.0
+    assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert _parse_retry_after("soon") is None
+
+
+@pytest.mark.asyncio
+@patch("smartapi_mcp.smartapi.validate_openapi_spec", return_value=True)
+async def test_async_smartapi_client_context_manager(mock_validate, tmp_path):
+    """Test AsyncSmartAPIClient queries the registry and closes its pool."""
+    mock_spec = {"info": {"title": "Test API"}}
+
+    def handler(request):
+        if request.url.path == "/api/query":
+            return httpx.Response(200, json={"hits": [{"_id": "test_id"}]})
+        return httpx.Response(200, json=mock_spec)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with (
+        patch("smartapi_mcp.smartapi.SPEC_CACHE_DIR", tmp_path),
+        patch.dict("smartapi_mcp.smartapi._spec_cache", clear=True),
+    ):
+        async with AsyncSmartAPIClient(http_client) as registry:
+            ids = await registry.get_ids("q")
+            assert ids == ["test_id"]
+            assert await registry.load_spec("test_id") == mock_spec
+            assert await registry.load_specs(ids) == {"test_id": mock_spec}
+
+    assert http_client.is_closed
+    mock_validate.assert_called_once_with(mock_spec)
+
+
+@pytest.mark.asyncio
+async def test_get_smartapi_ids_ttl_cache():
+    """Test query results are cached until they expire or no-cache is sent."""
+    responses = []
+
+    def handler(request):
+        responses.append(request.url.params["q"])
+        headers = (
+            {"Cache-Control": "no-cache"} if request.url.params["q"] == "nc" else {}
+        )
+        return httpx.Response(200, json={"hits": [{"_id": "id_1"}]}, headers=headers)
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with patch("smartapi_mcp.smartapi._get_client", return_value=client):
+            for q in ["q", "q", "nc", "nc"]:
+                assert await get_smartapi_ids(q) == ["id_1"]
+            assert responses == ["q", "nc", "nc"]
+
+            # once the TTL has passed the query is sent again
+            with patch(
+                "smartapi_mcp.smartapi.time.monotonic",
+                return_value=time.monotonic() + QUERY_CACHE_TTL + 1,
+            ):
+                await get_smartapi_ids("q")
+            assert responses == ["q", "nc", "nc", "q"]